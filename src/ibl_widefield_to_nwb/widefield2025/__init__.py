@@ -1,6 +1,22 @@
-from .nwbconverter import WidefieldProcessedNWBConverter, WidefieldRawNWBConverter
+import importlib
+
+# Submodule defining each public class; the submodules (and their dependencies) are only imported on first access
+_SUBMODULE_NAMES = dict(
+    WidefieldProcessedNWBConverter="nwbconverter",
+    WidefieldRawNWBConverter="nwbconverter",
+)
 
 __all__ = [
     "WidefieldProcessedNWBConverter",
     "WidefieldRawNWBConverter",
 ]
+
+
+def __getattr__(name: str):
+    if name not in _SUBMODULE_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{_SUBMODULE_NAMES[name]}", __name__), name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,8 +1,15 @@
-from .behavior import get_processed_behavior_interfaces, get_raw_behavior_interfaces
-from .build_cache import build_frame_cache, validate_cache
-from .download import download_widefield_session
-from .processed import convert_processed_session
-from .raw import convert_raw_session
+import importlib
+
+# Submodule defining each public function; the submodules (and their dependencies) are only imported on first access
+_SUBMODULE_NAMES = dict(
+    build_frame_cache="build_cache",
+    validate_cache="build_cache",
+    convert_raw_session="raw",
+    convert_processed_session="processed",
+    get_processed_behavior_interfaces="behavior",
+    get_raw_behavior_interfaces="behavior",
+    download_widefield_session="download",
+)
 
 __all__ = [
     "build_frame_cache",
@@ -13,3 +20,13 @@ __all__ = [
     "get_raw_behavior_interfaces",
     "download_widefield_session",
 ]
+
+
+def __getattr__(name: str):
+    if name not in _SUBMODULE_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{_SUBMODULE_NAMES[name]}", __name__), name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,8 +1,68 @@
 import re
+from fnmatch import fnmatch
 from pathlib import Path
 
 from one.api import ONE
 
+CAMERA_NAME_PATTERN = re.compile(r"(leftCamera|rightCamera|bodyCamera)")
+CAMERA_VIEW_PATTERN = re.compile(r"(left|right|body)")
+# The revision folder of a dataset path, right before the file name (e.g. 'alf/#2024-01-01#/licks.times.npy')
+REVISION_FOLDER_PATTERN = re.compile(r"(^|/)#[^/]*#$")
+# Upper bound on the number of interface availability results kept in memory
+MAX_NUM_CACHED_AVAILABILITIES = 256
+# File name patterns of the per-camera processed behavior data
+CAMERA_DATASET_PATTERNS = dict(
+    PoseEstimation="*.dlc*",
+    PupilTracking="*features*",
+    RoiMotionEnergy="*ROIMotionEnergy.npy*",
+)
+
+# Positive interface availability results, by (interface class, eid, keyword arguments), in insertion order
+_AVAILABILITY_BY_KEY: dict[tuple, dict] = dict()
+
+
+def _check_availability(interface_class: type, one: ONE, eid: str, **kwargs) -> dict:
+    """
+    Check whether the data of an interface is available for a session.
+
+    The same checks are repeated when both the raw and processed behavior interfaces are built for a session, so
+    positive results are cached per interface, session and keyword arguments. Negative results are not cached, since
+    a check can also fail transiently (e.g. on a network error).
+    """
+    key = (interface_class, eid, tuple(sorted(kwargs.items())))
+    if key in _AVAILABILITY_BY_KEY:
+        return _AVAILABILITY_BY_KEY[key]
+
+    availability = interface_class.check_availability(one=one, eid=eid, **kwargs)
+    if availability["available"]:
+        if len(_AVAILABILITY_BY_KEY) >= MAX_NUM_CACHED_AVAILABILITIES:
+            # drop the oldest result
+            del _AVAILABILITY_BY_KEY[next(iter(_AVAILABILITY_BY_KEY))]
+        _AVAILABILITY_BY_KEY[key] = availability
+    return availability
+
+
+def _split_dataset_path(dataset: str) -> tuple[str, str]:
+    """Split a dataset path into its collection (without the revision folder, as in ONE) and its file name."""
+    collection, _, filename = dataset.rpartition("/")
+    return REVISION_FOLDER_PATTERN.sub("", collection), filename
+
+
+def _filter_session_datasets(session_datasets: list[str], filename: str, collection: str | None = None) -> list[str]:
+    """
+    Return the session datasets (relative paths, e.g. 'alf/licks.times.npy') whose file name matches a wildcard
+    pattern, like `one.list_datasets(eid=eid, collection=collection, filename=filename)` but filtered locally from
+    the datasets listed once by `one.list_datasets(eid=eid)`.
+    """
+    matching_datasets = []
+    for dataset in session_datasets:
+        dataset_collection, dataset_filename = _split_dataset_path(dataset)
+        if collection is not None and dataset_collection != collection:
+            continue
+        if fnmatch(dataset_filename, filename):
+            matching_datasets.append(dataset)
+    return matching_datasets
+
 
 def get_processed_behavior_interfaces(
     one: ONE,
@@ -48,6 +108,8 @@ def get_processed_behavior_interfaces(
 
     data_interfaces = dict()
     interface_kwargs = dict(one=one, session=eid)
+    # the datasets of the session are listed once and then filtered locally instead of querying Alyx per lookup
+    session_datasets = one.list_datasets(eid=eid)
 
     data_interfaces["BrainwideMapTrials"] = BrainwideMapTrialsInterface(**interface_kwargs)
     data_interfaces["WheelPosition"] = WheelPositionInterface(**interface_kwargs)
@@ -55,24 +117,35 @@ def get_processed_behavior_interfaces(
     data_interfaces["WheelKinematics"] = WheelKinematicsInterface(**interface_kwargs)
 
     # Passive period data - add each interface if its data is available
-    if PassiveIntervalsInterface.check_availability(one, eid)["available"]:
+    if _check_availability(PassiveIntervalsInterface, one, eid)["available"]:
         data_interfaces["PassiveIntervals"] = PassiveIntervalsInterface(**interface_kwargs)
 
-    if PassiveReplayStimInterface.check_availability(one, eid)["available"]:
+    if _check_availability(PassiveReplayStimInterface, one, eid)["available"]:
         data_interfaces["PassiveReplayStim"] = PassiveReplayStimInterface(**interface_kwargs)
 
-    if PassiveRFMInterface.check_availability(one, eid)["available"]:
+    if _check_availability(PassiveRFMInterface, one, eid)["available"]:
         data_interfaces["PassiveRFM"] = PassiveRFMInterface(**interface_kwargs)
 
-    if one.list_datasets(eid=eid, collection="alf", filename="licks*"):
+    if _filter_session_datasets(session_datasets=session_datasets, collection="alf", filename="licks*"):
         data_interfaces["Lick"] = LickInterface(**interface_kwargs)
 
-    camera_name_pattern = r"(leftCamera|rightCamera|bodyCamera)"
-    pose_estimation_files = set([Path(f).name for f in one.list_datasets(eid=eid, filename="*.dlc*")])
-    for pose_estimation_file in pose_estimation_files:
-        camera_name = re.search(pattern=camera_name_pattern, string=pose_estimation_file).group(1)
-        pose_estimation_availability = IblPoseEstimationInterface.check_availability(
-            one=one, eid=eid, camera_name=camera_name
+    # Find the cameras with data for each camera interface in a single pass over the session datasets
+    camera_names_per_interface = {interface_name: [] for interface_name in CAMERA_DATASET_PATTERNS}
+    for dataset in session_datasets:
+        # most session datasets are not per-camera, skip them before matching the dataset patterns
+        camera_name_match = CAMERA_NAME_PATTERN.search(dataset)
+        if camera_name_match is None:
+            continue
+        camera_name = camera_name_match.group(1)
+        _, dataset_filename = _split_dataset_path(dataset)
+        for interface_name, pattern in CAMERA_DATASET_PATTERNS.items():
+            camera_names = camera_names_per_interface[interface_name]
+            if camera_name not in camera_names and fnmatch(dataset_filename, pattern):
+                camera_names.append(camera_name)
+
+    for camera_name in camera_names_per_interface["PoseEstimation"]:
+        pose_estimation_availability = _check_availability(
+            IblPoseEstimationInterface, one, eid, camera_name=camera_name
         )
         if pose_estimation_availability["available"]:
             tracker = "lightningPose"
@@ -84,20 +157,16 @@ def get_processed_behavior_interfaces(
         else:
             print(f"Pose estimation data for camera '{camera_name}' not available or failed to load, skipping...")
 
-    pupil_tracking_files = one.list_datasets(eid=eid, filename="*features*")
-    for pupil_tracking_file in pupil_tracking_files:
-        camera_name = re.search(pattern=camera_name_pattern, string=pupil_tracking_file).group(1)
-        if PupilTrackingInterface.check_availability(one=one, eid=eid, camera_name=camera_name)["available"]:
+    for camera_name in camera_names_per_interface["PupilTracking"]:
+        if _check_availability(PupilTrackingInterface, one, eid, camera_name=camera_name)["available"]:
             data_interfaces[f"PupilTracking_{camera_name}"] = PupilTrackingInterface(
                 camera_name=camera_name, **interface_kwargs
             )
         else:
             print(f"Pupil tracking data for camera '{camera_name}' not available or failed to load, skipping...")
 
-    roi_motion_energy_files = one.list_datasets(eid=eid, filename="*ROIMotionEnergy.npy*")
-    for roi_motion_energy_file in roi_motion_energy_files:
-        camera_name = re.search(pattern=camera_name_pattern, string=roi_motion_energy_file).group(1)
-        if RoiMotionEnergyInterface.check_availability(one=one, eid=eid, camera_name=camera_name)["available"]:
+    for camera_name in camera_names_per_interface["RoiMotionEnergy"]:
+        if _check_availability(RoiMotionEnergyInterface, one, eid, camera_name=camera_name)["available"]:
             data_interfaces[f"RoiMotionEnergy_{camera_name}"] = RoiMotionEnergyInterface(
                 camera_name=camera_name, **interface_kwargs
             )
@@ -105,7 +174,7 @@ def get_processed_behavior_interfaces(
             print(f"ROI motion energy data for camera '{camera_name}' not available or failed to load, skipping...")
 
     # Session epochs (high-level task vs passive phases)
-    if SessionEpochsInterface.check_availability(one, eid)["available"]:
+    if _check_availability(SessionEpochsInterface, one, eid)["available"]:
         data_interfaces["SessionEpochs"] = SessionEpochsInterface(one=one, session=eid)
 
     return data_interfaces
@@ -156,19 +225,19 @@ def get_raw_behavior_interfaces(
         nwbfiles_folder_path=nwbfiles_folder_path,
     )
 
-    camera_files = one.list_datasets(eid, filename="*Camera.raw.mp4*")
+    camera_files = _filter_session_datasets(session_datasets=one.list_datasets(eid=eid), filename="*Camera.raw.mp4*")
     for camera_file in camera_files:
         camera_name = get_camera_name_from_file(camera_file)
-        camera_view = re.search(r"(left|right|body)", camera_name).group(1)
+        camera_view = CAMERA_VIEW_PATTERN.search(camera_name).group(1)
         if camera_view is None:
             raise ValueError(f"Unexpected camera name '{camera_name}' extracted from file '{camera_file}'")
-        if RawVideoInterface.check_availability(one=one, eid=eid, camera_name=camera_view)["available"]:
+        if _check_availability(RawVideoInterface, one, eid, camera_name=camera_view)["available"]:
             data_interfaces[f"RawVideo_{camera_name}"] = RawVideoInterface(camera_name=camera_view, **interface_kwargs)
         else:
             print(f"Raw video data for camera '{camera_name}' not available or failed to load, skipping...")
 
     # Session epochs (high-level task vs passive phases)
-    if SessionEpochsInterface.check_availability(one, eid)["available"]:
+    if _check_availability(SessionEpochsInterface, one, eid)["available"]:
         data_interfaces["SessionEpochs"] = SessionEpochsInterface(one=one, session=eid)
 
     return data_interfaces
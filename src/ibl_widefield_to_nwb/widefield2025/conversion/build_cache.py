@@ -1,13 +1,36 @@
 import json
+import mmap
+import os
 import tempfile
 import time
+from contextlib import ExitStack
 from pathlib import Path
+from queue import Queue
+from threading import Event, Thread
+from typing import Callable, Literal
 
 import numpy as np
 from pydantic import DirectoryPath
+from tqdm import tqdm
 
+FRAMES_FILE_NAME = "frames.dat"
+COMPRESSED_FRAMES_FILE_NAME = "frames.b2nd"
 
-def build_frame_cache(folder_path: DirectoryPath, cache_folder_path: DirectoryPath = None, overwrite: bool = False):
+# Number of staging buffers shared between the decoder thread and the writer
+_NUM_STAGING_BUFFERS = 3
+# Written frames are flushed and dropped from memory every time this many bytes have been written to the cache
+_RELEASE_NUM_BYTES = 256 * 1024**2
+
+
+def build_frame_cache(
+    folder_path: DirectoryPath,
+    cache_folder_path: DirectoryPath = None,
+    overwrite: bool = False,
+    batch_size: int = 64,
+    decoder: Literal["opencv", "pyav", "nvdec"] = "opencv",
+    max_num_frames: int | None = None,
+    compressed: bool = False,
+):
     """
     Create a disk cache of grayscale frames as a single memory-mapped array.
 
@@ -23,29 +46,70 @@ def build_frame_cache(folder_path: DirectoryPath, cache_folder_path: DirectoryPa
         Directory to write cache; if None, a temporary directory is created and returned.
     overwrite : bool, optional
         Whether to overwrite existing cache files. Default is False.
+    batch_size : int, optional
+        Number of frames decoded into a staging buffer before they are converted to grayscale
+        with a single OpenCV call. Default is 64.
+    decoder : {"opencv", "pyav", "nvdec"}, optional
+        Backend used to decode the video. "opencv" (default) decodes to color frames and converts them to grayscale.
+        "pyav" requires `av` and decodes with FFmpeg frame threading, converting the decoded (YUV) frames to grayscale
+        with FFmpeg (swscale), which also expands limited-range luma to the full range. The cached values therefore
+        differ from the OpenCV conversion and the two caches are not interchangeable: the decoder is recorded in
+        `meta.json` and an existing cache built with another decoder is rebuilt.
+        "nvdec" is like "pyav" but decodes on an NVIDIA GPU (requires an FFmpeg build of `av` with CUDA support).
+    max_num_frames : int, optional
+        If provided, only the first `max_num_frames` frames of the video are cached (e.g. for stub tests).
+        An existing partial cache is rebuilt when more frames are requested.
+    compressed : bool, optional
+        If True, requires `blosc2` and writes the frames to a Blosc2 array (`frames.b2nd`, zstd + bitshuffle,
+        one chunk per batch of frames) instead of a raw memmap. This reduces the size of the cache several times
+        at the cost of decompressing frames on read. Only supported with decoder="opencv". Default is False.
 
     Notes
     -----
-    - Frames are converted to grayscale via OpenCV (`cv2.cvtColor(..., cv2.COLOR_BGR2GRAY)`)
+    - Frames are converted to grayscale via OpenCV (`cv2.cvtColor`), one batch at a time,
+      writing the result directly into the memmap. For uint8 frames OpenCV already uses a vectorized fixed-point
+      (integer) implementation of the Rec.601 weights, so a coarser custom integer kernel would not be faster and
+      would change the cached pixel values.
     - The memmap shape is determined from the grayscale frames. If the video reader
       reports a total frame count, that value is used to preallocate the memmap.
       If the count is unknown or incorrect, the function will stop when frames
       are exhausted and `meta.json` will record the actual number of frames written.
     """
-    import cv2
     from neuroconv.datainterfaces.behavior.video.video_utils import VideoCaptureContext
 
+    if decoder not in ("opencv", "pyav", "nvdec"):
+        raise ValueError(f"Decoder '{decoder}' not recognized. Use 'opencv', 'pyav' or 'nvdec'.")
+    if compressed and decoder != "opencv":
+        raise ValueError("A compressed frame cache is only supported with decoder='opencv'.")
+
     print(f"Building frame cache at {cache_folder_path} ...")
     frame_cache_start = time.time()
 
     cache_folder_path = Path(cache_folder_path or tempfile.mkdtemp(prefix="wf_cache_"))
     cache_folder_path.mkdir(parents=True, exist_ok=True)
-    data_path = cache_folder_path / "frames.dat"
+    data_path = cache_folder_path / (COMPRESSED_FRAMES_FILE_NAME if compressed else FRAMES_FILE_NAME)
     meta_path = cache_folder_path / "meta.json"
 
     if data_path.exists() and not overwrite:
-        print(f"Frame cache already exists at {cache_folder_path}, skipping rebuild.")
-        return cache_folder_path
+        try:
+            with open(meta_path, "r") as f:
+                cached_meta = json.load(f)
+        except FileNotFoundError:
+            cached_meta = dict()
+        cached_max_num_frames = cached_meta.get("max_num_frames")
+        # caches built before the decoder was recorded were decoded with OpenCV
+        cached_decoder = cached_meta.get("decoder", "opencv")
+        if cached_decoder != decoder:
+            print(f"Frame cache at {cache_folder_path} was built with decoder='{cached_decoder}', rebuilding.")
+        elif cached_meta.get("compressed", False) != compressed:
+            print(f"Frame cache at {cache_folder_path} was built with compressed={not compressed}, rebuilding.")
+        elif cached_max_num_frames is None or (max_num_frames is not None and max_num_frames <= cached_max_num_frames):
+            print(f"Frame cache already exists at {cache_folder_path}, skipping rebuild.")
+            return cache_folder_path
+        else:
+            print(
+                f"Frame cache at {cache_folder_path} only holds the first {cached_max_num_frames} frames, rebuilding."
+            )
 
     movie_file_paths = list(folder_path.glob("imaging.frames.mov"))
     if len(movie_file_paths) == 0:
@@ -56,31 +120,77 @@ def build_frame_cache(folder_path: DirectoryPath, cache_folder_path: DirectoryPa
         )
     movie_file_path = movie_file_paths[0]
 
-    video_capture_ob = VideoCaptureContext(movie_file_path)
+    # A cache left in the other format (built with `compressed` toggled) is deleted, so only one is ever read
+    other_data_path = cache_folder_path / (FRAMES_FILE_NAME if compressed else COMPRESSED_FRAMES_FILE_NAME)
+    other_data_path.unlink(missing_ok=True)
 
-    total_num_samples = video_capture_ob.get_video_frame_count()
-    # OpenCV returns frame shape as (height, width, color channels)
-    height, width, _ = video_capture_ob.get_frame_shape()
-    frame_dtype = video_capture_ob.get_video_frame_dtype()
-    frame_rate = video_capture_ob.get_video_fps()
+    # The video capture and the memmap are released deterministically, also when decoding or writing fails
+    with ExitStack() as stack:
+        video_capture_ob = VideoCaptureContext(movie_file_path)
+        stack.callback(video_capture_ob.release)
 
-    # allocate memmap for grayscale uint8 frames: shape (n_frames, H, W)
-    mem = np.memmap(str(data_path), dtype=frame_dtype, mode="w+", shape=(total_num_samples, height, width))
+        total_num_samples = video_capture_ob.get_video_frame_count()
+        if max_num_frames is not None:
+            total_num_samples = min(total_num_samples, max_num_frames)
+        # OpenCV returns frame shape as (height, width, color channels)
+        height, width, _ = video_capture_ob.get_frame_shape()
+        frame_dtype = video_capture_ob.get_video_frame_dtype()
+        frame_rate = video_capture_ob.get_video_fps()
 
-    frame_index = 0
-    while frame_index < total_num_samples:
-        try:
-            frame = next(video_capture_ob)
-        except StopIteration:
-            break
+        if compressed:
+            mem = _create_compressed_frame_cache(
+                data_path=data_path, shape=(total_num_samples, height, width), dtype=frame_dtype, batch_size=batch_size
+            )
+        else:
+            # allocate memmap for grayscale uint8 frames: shape (n_frames, H, W)
+            # (the blocks are reserved upfront so the file is laid out contiguously rather than grown sparsely)
+            _preallocate_file(
+                file_path=data_path, num_bytes=total_num_samples * height * width * np.dtype(frame_dtype).itemsize
+            )
+            frames_mmap = _map_file(file_path=data_path)
+            mem = np.ndarray(shape=(total_num_samples, height, width), dtype=frame_dtype, buffer=frames_mmap)
+            # flush and unmap the file even if writing fails (the compressed array is written to disk on assignment)
+            stack.callback(_close_mmap, frames_mmap)
+            # frames are written front to back in contiguous batches, exactly once
+            _advise_mmap(frames_mmap=frames_mmap, advice="MADV_SEQUENTIAL")
+
+        progress_bar = tqdm(total=total_num_samples, desc="Caching frames", unit="frames", mininterval=1.0)
+        stack.callback(progress_bar.close)
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        mem[frame_index] = gray
-        frame_index += 1
+        # The cache is not re-read while it is built, so written pages are released as we go to keep memory flat
+        frame_num_bytes = height * width * np.dtype(frame_dtype).itemsize
+        released_frame_index = 0
 
-    # flush and release
-    mem.flush()
-    video_capture_ob.release()
+        def on_frames_written(num_written_frames: int) -> None:
+            nonlocal released_frame_index
+            progress_bar.update(num_written_frames - progress_bar.n)
+            if compressed:
+                return
+            if (num_written_frames - released_frame_index) * frame_num_bytes >= _RELEASE_NUM_BYTES:
+                _release_frames(
+                    frames_mmap=frames_mmap,
+                    frame_num_bytes=frame_num_bytes,
+                    data_path=data_path,
+                    start_frame=released_frame_index,
+                    stop_frame=num_written_frames,
+                )
+                released_frame_index = num_written_frames
+
+        if decoder in ("pyav", "nvdec"):
+            video_capture_ob.release()
+            frame_index = _write_grayscale_frames_with_pyav(
+                movie_file_path=movie_file_path,
+                frames=mem,
+                on_frames_written=on_frames_written,
+                hwaccel_device_type="cuda" if decoder == "nvdec" else None,
+            )
+        else:
+            frame_index = _write_grayscale_frames_with_opencv(
+                video_capture_ob=video_capture_ob,
+                frames=mem,
+                batch_size=batch_size,
+                on_frames_written=on_frames_written,
+            )
 
     # store metadata (note: timestamps are not handled here; add camlog parsing if needed)
     meta = {
@@ -89,6 +199,9 @@ def build_frame_cache(folder_path: DirectoryPath, cache_folder_path: DirectoryPa
         "width": width,
         "dtype": str(frame_dtype),
         "fps": frame_rate,
+        "max_num_frames": max_num_frames,
+        "compressed": compressed,
+        "decoder": decoder,
     }
     with open(meta_path, "w") as f:
         json.dump(meta, f)
@@ -108,28 +221,275 @@ def build_frame_cache(folder_path: DirectoryPath, cache_folder_path: DirectoryPa
     return None
 
 
-def validate_cache(cache_folder_path: DirectoryPath):
+def _preallocate_file(file_path: Path, num_bytes: int) -> None:
+    """Create (or truncate) a file and reserve `num_bytes` of disk blocks for it, falling back to a sparse file."""
+    file_descriptor = os.open(str(file_path), os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            os.posix_fallocate(file_descriptor, 0, num_bytes)
+        except (AttributeError, OSError):
+            # not available on this platform or not supported by the filesystem
+            os.ftruncate(file_descriptor, num_bytes)
+    finally:
+        os.close(file_descriptor)
+
+
+def _map_file(file_path: Path) -> mmap.mmap:
+    """Map a (preallocated) file into memory for writing, as the buffer of the frames array."""
+    with open(file_path, "r+b") as f:
+        # the mapping stays valid after the file is closed
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE)
+
+
+def _close_mmap(frames_mmap: mmap.mmap) -> None:
+    """
+    Flush the mapped file to disk and unmap it without waiting for garbage collection.
+
+    The arrays viewing the mapping must not be used afterwards.
+    """
+    frames_mmap.flush()
+    frames_mmap.close()
+
+
+def _create_compressed_frame_cache(data_path: Path, shape: tuple[int, int, int], dtype: np.dtype, batch_size: int):
+    """Create an empty on-disk Blosc2 array for the frames, with one chunk per batch of frames."""
+    try:
+        import blosc2
+    except ImportError as e:
+        raise ImportError(
+            "blosc2 is required for a compressed frame cache. Please install it with `pip install blosc2`."
+        ) from e
+
+    _, height, width = shape
+    return blosc2.empty(
+        shape=shape,
+        dtype=dtype,
+        chunks=(batch_size, height, width),
+        blocks=(1, height, width),
+        urlpath=str(data_path),
+        mode="w",
+        cparams=dict(codec=blosc2.Codec.ZSTD, clevel=3, filters=[blosc2.Filter.BITSHUFFLE]),
+    )
+
+
+def _advise_mmap(frames_mmap: mmap.mmap, advice: str) -> None:
+    """Give the kernel an access pattern hint (e.g. "MADV_SEQUENTIAL") for the whole mapping, where supported."""
+    if not hasattr(mmap, advice):
+        return
+    frames_mmap.madvise(getattr(mmap, advice))
+
+
+def _release_frames(
+    frames_mmap: mmap.mmap, frame_num_bytes: int, data_path: Path, start_frame: int, stop_frame: int
+) -> None:
+    """
+    Write back frames [start_frame, stop_frame) of the mapped file to disk and drop their pages from memory.
+
+    Uses madvise(MADV_DONTNEED) on the mapping and posix_fadvise(POSIX_FADV_DONTNEED) on the file, where supported.
+    """
+    # flush and madvise require page aligned offsets
+    start = start_frame * frame_num_bytes // mmap.PAGESIZE * mmap.PAGESIZE
+    length = stop_frame * frame_num_bytes - start
+    frames_mmap.flush(start, length)
+    if hasattr(mmap, "MADV_DONTNEED"):
+        frames_mmap.madvise(mmap.MADV_DONTNEED, start, length)
+    if hasattr(os, "posix_fadvise"):
+        fd = os.open(data_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, start, length, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def _write_grayscale_frames_with_opencv(
+    video_capture_ob,
+    frames: np.ndarray,
+    batch_size: int,
+    on_frames_written: Callable[[int], None] | None = None,
+) -> int:
+    """
+    Decode frames with OpenCV and write them as grayscale into `frames`, one batch at a time.
+
+    Decoding runs in a background thread that fills a small pool of staging buffers, while the calling
+    thread converts the decoded batches to grayscale and writes them into `frames` (a memmap or a Blosc2 array).
+    OpenCV releases the GIL while decoding and converting, so both stages overlap. If provided, `on_frames_written`
+    is called from the calling thread with the number of frames written so far after each batch.
+
+    Returns the number of frames written.
+    """
+    import cv2
+
+    total_num_samples, height, width = frames.shape
+    # Frames are decoded straight into the staging buffers with the underlying cv2.VideoCapture, which avoids the
+    # per-frame allocation (and channel flip to RGB) of iterating over the VideoCaptureContext.
+    video_capture = video_capture_ob.vc
+
+    # Pool of staging buffers for batches of color frames: shape (batch_size, H, W, 3).
+    # The size of the pool bounds the memory used by decoded batches that are waiting to be written.
+    free_buffers = Queue()
+    for _ in range(_NUM_STAGING_BUFFERS):
+        free_buffers.put(np.empty((batch_size, height, width, 3), dtype=frames.dtype))
+    decoded_batches = Queue()
+    stop_decoding = Event()
+    decoder_errors = []
+
+    def decode_batches():
+        frame_index = 0
+        try:
+            while frame_index < total_num_samples and not stop_decoding.is_set():
+                staging = free_buffers.get()
+                num_requested_frames = min(batch_size, total_num_samples - frame_index)
+                num_batch_frames = 0
+                while num_batch_frames < num_requested_frames:
+                    staging_frame = staging[num_batch_frames]
+                    success, frame = video_capture.read(staging_frame)
+                    if not success:
+                        break
+                    if frame is not staging_frame:
+                        # OpenCV allocated a new frame instead of decoding in place
+                        staging_frame[:] = frame
+                    num_batch_frames += 1
+
+                if num_batch_frames == 0:
+                    break
+                decoded_batches.put((staging, num_batch_frames))
+                frame_index += num_batch_frames
+
+                if num_batch_frames < num_requested_frames:
+                    break
+        except Exception as e:
+            decoder_errors.append(e)
+        finally:
+            decoded_batches.put(None)
+
+    decoder_thread = Thread(target=decode_batches, name="frame-cache-decoder", daemon=True)
+    decoder_thread.start()
+
+    frame_index = 0
+    try:
+        while (decoded_batch := decoded_batches.get()) is not None:
+            staging, num_batch_frames = decoded_batch
+            try:
+                # Stack the batch along the rows so the whole batch is converted with a single call.
+                # The staging buffers hold the frames in OpenCV's BGR order, the conversion keeps the channel weights
+                # of the cache built from the RGB frames of VideoCaptureContext with COLOR_BGR2GRAY.
+                color_batch = staging[:num_batch_frames].reshape(num_batch_frames * height, width, 3)
+                frames_slice = slice(frame_index, frame_index + num_batch_frames)
+                if isinstance(frames, np.ndarray):
+                    # write the grayscale frames straight into the memmap slice
+                    cv2.cvtColor(
+                        color_batch,
+                        cv2.COLOR_RGB2GRAY,
+                        dst=frames[frames_slice].reshape(num_batch_frames * height, width),
+                    )
+                else:
+                    # compressed arrays are written (and compressed) one chunk of frames at a time
+                    gray_batch = cv2.cvtColor(color_batch, cv2.COLOR_RGB2GRAY)
+                    frames[frames_slice] = gray_batch.reshape(num_batch_frames, height, width)
+            finally:
+                free_buffers.put(staging)
+            frame_index += num_batch_frames
+            if on_frames_written is not None:
+                on_frames_written(frame_index)
+    finally:
+        stop_decoding.set()
+        decoder_thread.join()
+
+    if decoder_errors:
+        raise decoder_errors[0]
+
+    return frame_index
+
+
+def _write_grayscale_frames_with_pyav(
+    movie_file_path: Path,
+    frames: np.ndarray,
+    on_frames_written: Callable[[int], None] | None = None,
+    hwaccel_device_type: str | None = None,
+) -> int:
+    """
+    Decode frames with PyAV and write their luma plane into `frames`.
+
+    If provided, `on_frames_written` is called with the number of frames written so far after each frame.
+    If `hwaccel_device_type` is provided (e.g. "cuda" for NVDEC), the frames are decoded on that device and
+    only downloaded to system memory to extract the luma plane; decoding fails if the device is not available.
+
+    Returns the number of frames written.
+    """
+    try:
+        import av
+    except ImportError as e:
+        raise ImportError("PyAV is required for decoder='pyav'. Please install it with `pip install av`.") from e
+
+    total_num_samples = frames.shape[0]
+    frame_index = 0
+    hwaccel = None
+    if hwaccel_device_type is not None:
+        from av.codec.hwaccel import HWAccel
+
+        hwaccel = HWAccel(device_type=hwaccel_device_type, allow_software_fallback=False)
+
+    with av.open(str(movie_file_path), hwaccel=hwaccel) as container:
+        stream = container.streams.video[0]
+        if hwaccel is None:
+            stream.thread_type = "AUTO"
+        for frame in container.decode(stream):
+            if frame_index >= total_num_samples:
+                break
+            # FFmpeg (swscale) converts the decoded frame to grayscale, scaling limited-range luma to the full range
+            frames[frame_index] = frame.to_ndarray(format="gray")
+            frame_index += 1
+            if on_frames_written is not None:
+                on_frames_written(frame_index)
+
+    return frame_index
+
+
+def validate_cache(cache_folder_path: DirectoryPath, decoder: str | None = None):
     """
     Quick validations:
       - meta key `total_num_samples` present
+      - the cache was built with `decoder`, if provided (caches without a recorded decoder were built with OpenCV)
       - memmap file size matches expected (total * H * W * itemsize)
+      - compressed array shape matches expected (total, H, W)
       - timestamps shape matches total
     """
 
     cache_folder_path = Path(cache_folder_path)
     meta_path = cache_folder_path / "meta.json"
-    data_path = cache_folder_path / "frames.dat"
 
     with open(meta_path, "r") as f:
         meta = json.load(f)
 
+    cached_decoder = meta.get("decoder", "opencv")
+    if decoder is not None and cached_decoder != decoder:
+        raise ValueError(f"Frame cache was built with decoder='{cached_decoder}', expected decoder='{decoder}'")
+
+    compressed = meta.get("compressed", False)
+    data_path = cache_folder_path / (COMPRESSED_FRAMES_FILE_NAME if compressed else FRAMES_FILE_NAME)
+
     total = int(meta.get("total_num_samples", 0))
     h = int(meta.get("height", 0))
     w = int(meta.get("width", 0))
     dtype_name = meta.get("dtype", "uint8")
     dtype = np.dtype(dtype_name)
+    if compressed:
+        import blosc2
+
+        try:
+            actual_shape = blosc2.open(str(data_path), mode="r").shape
+        except FileNotFoundError:
+            actual_shape = None
+        if actual_shape != (total, h, w):
+            raise ValueError(f"{data_path.name} shape mismatch: expected {(total, h, w)}, got {actual_shape}")
+        print("Cache validation passed.")
+        return
+
     expected_size = total * h * w * dtype.itemsize
-    actual_size = data_path.stat().st_size if data_path.exists() else 0
+    try:
+        actual_size = data_path.stat().st_size
+    except FileNotFoundError:
+        actual_size = 0
     if actual_size != expected_size:
         raise ValueError(f"frames.dat size mismatch: expected {expected_size} bytes, got {actual_size} bytes")
     print("Cache validation passed.")
@@ -1,5 +1,4 @@
 import shutil
-from pathlib import Path
 
 from ibl_widefield_to_nwb.widefield2025.datainterfaces import (
     IblNIDQInterface,
@@ -9,6 +8,22 @@ from ibl_widefield_to_nwb.widefield2025.datainterfaces import (
 )
 
 
+def _clear_session_data(one, eid: str) -> None:
+    """
+    Delete the local data of a session (its folder in the ONE cache directory), so that it is downloaded again.
+
+    Only the folder of this session is deleted, so the data of other sessions (e.g. converted concurrently) is kept.
+    """
+    session_folder_path = one.eid2path(eid)
+    if session_folder_path is None:
+        return
+    try:
+        shutil.rmtree(session_folder_path)
+    except FileNotFoundError:
+        return
+    print(f"Redownloading data for session '{eid}'. Cleared its folder '{session_folder_path}' first.")
+
+
 def download_widefield_session(
     eid: str,
     one=None,
@@ -27,7 +42,8 @@ def download_widefield_session(
     mode: str, default: "raw"
         Mode of data to download. Options are "raw" or "processed".
     redownload_data: bool, default: False
-        If True, redownload data from ONE even if it already exists locally.
+        If True, redownload data from ONE even if it already exists locally (the local folder of the session is
+        deleted first).
 
     Returns
     -------
@@ -38,12 +54,8 @@ def download_widefield_session(
     if one is None:
         raise ValueError("ONE instance must be provided.")
 
-    session_folder = Path(one.cache_dir)
-    cached_files = list(one.cache_dir.rglob("*"))
-    if redownload_data and len(cached_files) > 0:
-        print(f"Redownloading data for session '{eid}'. Clearing cache directory first.")
-        shutil.rmtree(session_folder)
-        session_folder.mkdir(parents=True, exist_ok=True)
+    if redownload_data:
+        _clear_session_data(one=one, eid=eid)
 
     widefield_session_files = []
     match mode:
@@ -68,12 +80,13 @@ def download_widefield_session(
         case _:
             raise ValueError(f"Mode '{mode}' not recognized. Use 'raw' or 'processed'.")
 
-    # Calculate total size
+    # Calculate total size (a single stat per file, missing files are skipped)
     total_size_bytes = 0
-    if one.cache_dir.exists():
-        for file_path in widefield_session_files:
-            if file_path.is_file():
-                total_size_bytes += file_path.stat().st_size
+    for file_path in widefield_session_files:
+        try:
+            total_size_bytes += file_path.stat().st_size
+        except FileNotFoundError:
+            continue
 
     total_size_gb = total_size_bytes / (1024**3)
     print(f"Total data size: {total_size_gb:.2f} GB ({total_size_bytes:,} bytes)")
@@ -1,8 +1,13 @@
+import math
+import os
 import time
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
-from neuroconv.utils import dict_deep_update, load_dict_from_file
+import numpy as np
+from neuroconv.tools.nwb_helpers import HDF5BackendConfiguration, configure_backend
+from neuroconv.utils import dict_deep_update
+from pynwb import NWBHDF5IO, NWBFile
 
 from ibl_widefield_to_nwb.widefield2025 import WidefieldProcessedNWBConverter
 from ibl_widefield_to_nwb.widefield2025.conversion import (
@@ -12,6 +17,12 @@ from ibl_widefield_to_nwb.widefield2025.datainterfaces import (
     IblWidefieldLandmarksInterface,
     WidefieldSVDInterface,
 )
+from ibl_widefield_to_nwb.widefield2025.utils import _load_metadata_file
+
+# Target size of the HDF5 chunks of the SVD datasets
+SVD_CHUNK_SIZE_BYTES = 1024**2
+# Upper bound on the size of the buffers the SVD datasets are written with (i.e. on the data read into memory at once)
+SVD_BUFFER_SIZE_BYTES = 1024**3
 
 
 def convert_processed_session(
@@ -22,6 +33,7 @@ def convert_processed_session(
     one_api_kwargs: dict,
     stub_test: bool = False,
     append_on_disk_nwbfile: bool = False,
+    in_memory_stage: bool = False,
 ):
     """
     Convert a single session of processed widefield imaging data to NWB format.
@@ -52,27 +64,29 @@ def convert_processed_session(
         Whether to run a stub test (process a smaller subset of data for testing purposes).
     append_on_disk_nwbfile: bool, default: False
         If True, append data to an existing on-disk NWB file instead of creating a new one.
+    in_memory_stage: bool, default: False
+        If True, build the HDF5 file in memory and write it to disk in a single pass when it is closed, instead of
+        issuing many small writes (useful for stub tests and sessions dominated by small behavior datasets).
+        Ignored when appending, or when the uncompressed data would not fit in the available memory.
     """
 
     processed_data_dir_path = Path(processed_data_dir_path)
     nwbfile_path = Path(nwbfile_path)
     nwbfile_path.parent.mkdir(parents=True, exist_ok=True)
 
-    overwrite = False
-    if nwbfile_path.exists() and not append_on_disk_nwbfile:
-        overwrite = True
-
-    data_interfaces = dict()
-    conversion_options = dict()
+    # A new file is created (or an existing one truncated) unless appending; the writer handles both cases
+    overwrite = not append_on_disk_nwbfile
 
     # Add SVD interfaces
-    data_interfaces["SVDCalcium"] = WidefieldSVDInterface(
-        folder_path=processed_data_dir_path,
-        excitation_wavelength_nm=functional_wavelength_nm,
-    )
-    data_interfaces["SVDIsosbestic"] = WidefieldSVDInterface(
-        folder_path=processed_data_dir_path,
-        excitation_wavelength_nm=isosbestic_wavelength_nm,
+    data_interfaces = dict(
+        SVDCalcium=WidefieldSVDInterface(
+            folder_path=processed_data_dir_path,
+            excitation_wavelength_nm=functional_wavelength_nm,
+        ),
+        SVDIsosbestic=WidefieldSVDInterface(
+            folder_path=processed_data_dir_path,
+            excitation_wavelength_nm=isosbestic_wavelength_nm,
+        ),
     )
 
     processed_data_conversion_options = dict(
@@ -80,24 +94,18 @@ def convert_processed_session(
         include_roi_centroids=False,
         include_roi_acceptance=False,
     )
-    conversion_options.update(
-        dict(
-            SVDCalcium=dict(plane_segmentation_name="SVDTemporalComponentsCalcium", **processed_data_conversion_options)
-        )
-    )
-    conversion_options.update(
-        dict(
-            SVDIsosbestic=dict(
-                plane_segmentation_name="SVDTemporalComponentsIsosbestic", **processed_data_conversion_options
-            )
-        )
+    conversion_options = dict(
+        SVDCalcium=dict(plane_segmentation_name="SVDTemporalComponentsCalcium", **processed_data_conversion_options),
+        SVDIsosbestic=dict(
+            plane_segmentation_name="SVDTemporalComponentsIsosbestic", **processed_data_conversion_options
+        ),
     )
 
     # Add landmarks
     landmarks_file_path = processed_data_dir_path / "widefieldLandmarks.dorsalCortex.json"
     if landmarks_file_path.exists():
         data_interfaces["Landmarks"] = IblWidefieldLandmarksInterface(file_path=landmarks_file_path)
-        conversion_options.update(dict(Landmarks=dict()))
+        conversion_options["Landmarks"] = dict()
 
     # Add Behavior
     behavior_interfaces = get_processed_behavior_interfaces(**one_api_kwargs)
@@ -113,22 +121,39 @@ def convert_processed_session(
     metadata["NWBFile"]["session_start_time"] = session_start_time
 
     # Update default metadata with the editable in the corresponding yaml file
-    editable_metadata_path = Path(__file__).parent.parent / "_metadata" / "widefield_general_metadata.yaml"
-    editable_metadata = load_dict_from_file(editable_metadata_path)
-    metadata = dict_deep_update(metadata, editable_metadata)
+    # (in place: both dicts are fresh copies, so the default metadata does not need to be deep-copied first)
+    editable_metadata = _load_metadata_file("widefield_general_metadata.yaml")
+    metadata = dict_deep_update(metadata, editable_metadata, copy=False)
 
     metadata["Subject"]["subject_id"] = "a_subject_id"  # Modify here or in the yaml file
 
     print(f"Writing to NWB '{nwbfile_path}' ...")
     conversion_start = time.time()
 
-    converter.run_conversion(
-        metadata=metadata,
-        nwbfile_path=nwbfile_path,
-        conversion_options=conversion_options,
-        append_on_disk_nwbfile=append_on_disk_nwbfile,
-        overwrite=overwrite,
-    )
+    # The interfaces are added to a staging in-memory NWB file to get the shapes and data types of its datasets, from
+    # which the chunking of the SVD datasets is configured. run_conversion builds (or appends to) the NWB file it writes
+    # again, and neuroconv maps the configuration onto it by location in the file.
+    converter.validate_metadata(metadata=metadata, append_mode=append_on_disk_nwbfile)
+    converter.validate_conversion_options(conversion_options=conversion_options)
+    nwbfile = converter.create_nwbfile(metadata=metadata, conversion_options=conversion_options)
+    backend_configuration = converter.get_default_backend_configuration(nwbfile=nwbfile, backend="hdf5")
+    _configure_svd_datasets(backend_configuration=backend_configuration)
+
+    if in_memory_stage and not append_on_disk_nwbfile and _fits_in_memory(backend_configuration=backend_configuration):
+        # The staging NWB file is written as is through the HDF5 'core' driver (a new file is always written here,
+        # and this converter does not align the interfaces in time)
+        _write_nwbfile_in_memory(
+            nwbfile=nwbfile, nwbfile_path=nwbfile_path, backend_configuration=backend_configuration
+        )
+    else:
+        converter.run_conversion(
+            metadata=metadata,
+            nwbfile_path=nwbfile_path,
+            conversion_options=conversion_options,
+            backend_configuration=backend_configuration,
+            append_on_disk_nwbfile=append_on_disk_nwbfile,
+            overwrite=overwrite,
+        )
 
     conversion_time = time.time() - conversion_start
 
@@ -140,3 +165,107 @@ def convert_processed_session(
     print(f"Total data ({nwbfile_path.name}) size: {total_size_gb:.2f} GB ({total_size_bytes:,} bytes)")
 
     return nwbfile_path
+
+
+def _get_available_memory_bytes() -> int:
+    """Return the available memory, from psutil if it is installed and from the system configuration otherwise."""
+    try:
+        import psutil
+    except ImportError:
+        if not hasattr(os, "sysconf"):
+            return 0
+        # The number of free pages is not reported on every platform (e.g. macOS), use the total memory there
+        num_pages_name = "SC_AVPHYS_PAGES" if "SC_AVPHYS_PAGES" in os.sysconf_names else "SC_PHYS_PAGES"
+        return os.sysconf(num_pages_name) * os.sysconf("SC_PAGE_SIZE")
+    return psutil.virtual_memory().available
+
+
+def _fits_in_memory(backend_configuration: HDF5BackendConfiguration) -> bool:
+    """Whether the (uncompressed) datasets of the NWB file fit in the currently available memory."""
+    total_num_bytes = sum(
+        int(np.prod(dataset_configuration.full_shape, dtype="uint64")) * dataset_configuration.dtype.itemsize
+        for dataset_configuration in backend_configuration.dataset_configurations.values()
+    )
+    return total_num_bytes < _get_available_memory_bytes()
+
+
+def _write_nwbfile_in_memory(
+    nwbfile: NWBFile, nwbfile_path: Path, backend_configuration: HDF5BackendConfiguration
+) -> None:
+    """
+    Write the NWB file through the HDF5 'core' driver: the file image is built in memory and written to
+    `nwbfile_path` in a single sequential write when the file is closed.
+    """
+    configure_backend(nwbfile=nwbfile, backend_configuration=backend_configuration)
+    with NWBHDF5IO(nwbfile_path, mode="w", driver="core") as io:
+        io.write(nwbfile)
+
+
+def _get_svd_compression() -> tuple[str, dict]:
+    """Return the compression method and options of the SVD datasets (Blosc zstd if hdf5plugin is installed)."""
+    try:
+        import hdf5plugin
+    except ImportError:
+        return "gzip", dict(level=4)
+    return "Blosc", dict(cname="zstd", clevel=3, shuffle=hdf5plugin.Blosc.BITSHUFFLE)
+
+
+def _configure_svd_datasets(backend_configuration: HDF5BackendConfiguration) -> None:
+    """
+    Chunk the SVD datasets along the axis they are read by, instead of the default (roughly cubic) chunks,
+    and compress them.
+
+    - The temporal components (time, components) are chunked per component, over up to ~1 MB of samples.
+    - The spatial components (image masks, shape (components, height, width)) are chunked per component image.
+    - The SVD datasets and the summary (frame average) images are compressed with Blosc (zstd, bitshuffle) when
+      `hdf5plugin` is installed, and with gzip otherwise. Other (small) datasets keep their default configuration.
+
+    Parameters
+    ----------
+    backend_configuration : HDF5BackendConfiguration
+        The backend configuration to modify in place.
+    """
+    ophys_metadata = _load_metadata_file("widefield_ophys_metadata.yaml")["Ophys"]
+    temporal_components_location = f"processing/ophys/{ophys_metadata['Fluorescence']['name']}/"
+    spatial_components_location = f"processing/ophys/{ophys_metadata['ImageSegmentation']['name']}/"
+    summary_images_location = f"processing/ophys/{ophys_metadata['SegmentationImages']['name']}/"
+    compression_method, compression_options = _get_svd_compression()
+
+    for location_in_file, dataset_configuration in backend_configuration.dataset_configurations.items():
+        full_shape = dataset_configuration.full_shape
+        if location_in_file.startswith(temporal_components_location) and location_in_file.endswith("/data"):
+            num_samples_per_chunk = SVD_CHUNK_SIZE_BYTES // dataset_configuration.dtype.itemsize
+            chunk_shape = (min(full_shape[0], num_samples_per_chunk), *(1 for _ in full_shape[1:]))
+        elif location_in_file.startswith(spatial_components_location) and location_in_file.endswith("/image_mask/data"):
+            chunk_shape = (1, *full_shape[1:])
+        elif location_in_file.startswith(summary_images_location):
+            chunk_shape = dataset_configuration.chunk_shape
+        else:
+            continue
+
+        # The default buffer shape is not necessarily a multiple of the new chunk shape
+        dataset_configuration.buffer_shape = _get_svd_buffer_shape(
+            chunk_shape=chunk_shape, full_shape=full_shape, itemsize=dataset_configuration.dtype.itemsize
+        )
+        dataset_configuration.chunk_shape = chunk_shape
+        dataset_configuration.compression_method = compression_method
+        dataset_configuration.compression_options = compression_options
+
+
+def _get_svd_buffer_shape(chunk_shape: tuple[int, ...], full_shape: tuple[int, ...], itemsize: int) -> tuple[int, ...]:
+    """
+    Return the largest buffer shape of at most SVD_BUFFER_SIZE_BYTES that is made of whole chunks.
+
+    The buffer is grown from the last axis to the first one, so e.g. the buffers of the spatial components hold whole
+    component images, and those of the temporal components all the components of consecutive samples.
+    """
+    buffer_shape = list(chunk_shape)
+    for axis in reversed(range(len(full_shape))):
+        num_bytes_per_index = math.prod(buffer_shape[:axis] + buffer_shape[axis + 1 :]) * itemsize
+        max_axis_length = SVD_BUFFER_SIZE_BYTES // num_bytes_per_index
+        if max_axis_length >= full_shape[axis]:
+            buffer_shape[axis] = full_shape[axis]
+            continue
+        buffer_shape[axis] = max(chunk_shape[axis], max_axis_length // chunk_shape[axis] * chunk_shape[axis])
+        break
+    return tuple(buffer_shape)
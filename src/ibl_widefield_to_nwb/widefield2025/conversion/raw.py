@@ -6,8 +6,7 @@ from pathlib import Path
 from zoneinfo import ZoneInfo
 
 from ibl_to_nwb.utils import decompress_ephys_cbins
-from neuroconv.utils import dict_deep_update, load_dict_from_file
-from pynwb import read_nwb
+from neuroconv.utils import dict_deep_update
 
 from ibl_widefield_to_nwb.widefield2025 import WidefieldRawNWBConverter
 from ibl_widefield_to_nwb.widefield2025.conversion import get_raw_behavior_interfaces
@@ -19,8 +18,15 @@ from ibl_widefield_to_nwb.widefield2025.utils import (
     _build_nidq_metadata_from_wiring,
     _get_analog_channel_groups_from_wiring,
     _get_digital_channel_groups_from_wiring,
+    _load_metadata_file,
 )
 
+# Number of (interleaved) video frames cached when running a stub test
+STUB_TEST_NUM_FRAMES = 500
+# Size of the read/write buffer and of the HDF5 chunks of the raw imaging data; larger buffers mean fewer, larger writes
+IMAGING_ITERATOR_BUFFER_GB = 1.0
+IMAGING_ITERATOR_CHUNK_MB = 16.0
+
 
 def convert_raw_session(
     nwbfile_path: str | Path,
@@ -34,6 +40,7 @@ def convert_raw_session(
     force_cache: bool = False,
     stub_test: bool = False,
     append_on_disk_nwbfile: bool = False,
+    verify: bool = False,
 ) -> Path:
     """
     Convert a single session of widefield raw imaging data to NWB format.
@@ -60,6 +67,8 @@ def convert_raw_session(
         If True, run a stub test (process a small subset of the data for testing purposes).
     append_on_disk_nwbfile: bool, default: False
         If True, append data to an existing on-disk NWB file instead of creating a new one.
+    verify: bool, default: False
+        If True, read back the written NWB file and print the names of its acquisition objects.
 
     Returns
     -------
@@ -76,15 +85,20 @@ def convert_raw_session(
     nwbfile_path = Path(nwbfile_path)
     nwbfile_path.parent.mkdir(parents=True, exist_ok=True)
 
-    overwrite = False
-    if nwbfile_path.exists() and not append_on_disk_nwbfile:
-        overwrite = True
+    # A new file is created (or an existing one truncated) unless appending; the writer handles both cases
+    overwrite = not append_on_disk_nwbfile
 
     # ========================================================================
     # STEP 1: Build Frame Cache
     # ========================================================================
 
-    build_frame_cache(folder_path=data_dir_path, cache_folder_path=cache_dir_path, overwrite=force_cache)
+    # Stub tests only write the first frames of each channel, so there is no need to cache the whole video
+    build_frame_cache(
+        folder_path=data_dir_path,
+        cache_folder_path=cache_dir_path,
+        overwrite=force_cache,
+        max_num_frames=STUB_TEST_NUM_FRAMES if stub_test else None,
+    )
     validate_cache(cache_folder_path=cache_dir_path)
 
     # ========================================================================
@@ -116,6 +130,8 @@ def convert_raw_session(
                 photon_series_index=0,
                 stub_test=stub_test,
                 iterator_options=dict(
+                    buffer_gb=IMAGING_ITERATOR_BUFFER_GB,
+                    chunk_mb=IMAGING_ITERATOR_CHUNK_MB,
                     display_progress=True,
                     progress_bar_options=dict(desc="Writing raw imaging data for functional channel..."),
                 ),
@@ -136,6 +152,8 @@ def convert_raw_session(
                 photon_series_index=1,
                 stub_test=stub_test,
                 iterator_options=dict(
+                    buffer_gb=IMAGING_ITERATOR_BUFFER_GB,
+                    chunk_mb=IMAGING_ITERATOR_CHUNK_MB,
                     display_progress=True,
                     progress_bar_options=dict(desc="Writing raw imaging data for isosbestic channel..."),
                 ),
@@ -145,13 +163,12 @@ def convert_raw_session(
 
     # Add NIDQ
     wiring_file_name = "_spikeglx_ephysData_g0_t0.nidq.wiring.json"
-    wiring_file_paths = list(nidq_data_dir_path.glob(wiring_file_name))
-    if len(wiring_file_paths) != 1:
-        raise FileNotFoundError(
-            f"Expected exactly one wiring json file ('{wiring_file_name}'), found {len(wiring_file_paths)} files."
-        )
-    wiring_file_path = str(wiring_file_paths[0])
-    wiring = json.load(open(wiring_file_path, "r"))
+    # the name has no wildcards, so a single stat replaces globbing the directory
+    wiring_file_path = nidq_data_dir_path / wiring_file_name
+    if not wiring_file_path.is_file():
+        raise FileNotFoundError(f"Wiring json file '{wiring_file_name}' not found in folder: {nidq_data_dir_path}")
+    with open(wiring_file_path, "r") as f:
+        wiring = json.load(f)
 
     analog_channel_groups = _get_analog_channel_groups_from_wiring(wiring=wiring)
     digital_channel_groups = _get_digital_channel_groups_from_wiring(wiring=wiring)
@@ -196,18 +213,18 @@ def convert_raw_session(
         session_start_time = session_start_time.replace(tzinfo=ZoneInfo("US/Eastern"))
     metadata["NWBFile"]["session_start_time"] = session_start_time
 
-    # Update default metadata with the editable in the corresponding yaml file
-    editable_metadata_path = Path(__file__).parent.parent / "_metadata" / "widefield_general_metadata.yaml"
-    editable_metadata = load_dict_from_file(editable_metadata_path)
-    metadata = dict_deep_update(metadata, editable_metadata)
+    # Editable metadata in the corresponding yaml file
+    editable_metadata = _load_metadata_file("widefield_general_metadata.yaml")
 
     # Update nidq metadata with wiring info
-    nidq_metadata_path = Path(__file__).parent.parent / "_metadata" / "widefield_nidq_metadata.yaml"
-    nidq_device_metadata = load_dict_from_file(nidq_metadata_path)
+    nidq_device_metadata = _load_metadata_file("widefield_nidq_metadata.yaml")
 
     # Dynamically build metadata based on wiring.json (maps devices to actual channel IDs)
     nidq_metadata = _build_nidq_metadata_from_wiring(wiring=wiring, device_metadata=nidq_device_metadata)
-    metadata = dict_deep_update(metadata, nidq_metadata)
+
+    # Merge the (small) metadata updates first, so the (large) default metadata is deep-copied and traversed once
+    metadata_updates = dict_deep_update(editable_metadata, nidq_metadata, copy=False)
+    metadata = dict_deep_update(metadata, metadata_updates)
 
     # ========================================================================
     # STEP 6: Write NWB file to disk
@@ -224,11 +241,15 @@ def convert_raw_session(
         overwrite=overwrite,
     )
 
-    nwbfile = read_nwb(nwbfile_path)
-    print(nwbfile.acquisition)
-
     conversion_time = time.time() - conversion_start
 
+    if verify:
+        from pynwb import NWBHDF5IO
+
+        with NWBHDF5IO(nwbfile_path, "r") as io:
+            nwbfile = io.read()
+            print(f"Acquisition: {list(nwbfile.acquisition.keys())}")
+
     # Calculate total size
     total_size_bytes = nwbfile_path.stat().st_size
     total_size_gb = total_size_bytes / (1024**3)
@@ -1,13 +1,23 @@
 """Primary script to run to convert all sessions in a dataset using session_to_nwb."""
+
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Union
-from concurrent.futures import ProcessPoolExecutor, as_completed
 from pprint import pformat
-import traceback
+from typing import Callable, Union
+
+from one.api import ONE
 from tqdm import tqdm
 
+from ibl_widefield_to_nwb.widefield2025.conversion import download_widefield_session
+from ibl_widefield_to_nwb.widefield2025.utils import _fetch_sessions_metadata
+
 from .convert_session import session_to_nwb
 
+# Upper bound on the number of sessions converted concurrently (each one downloads from ONE)
+MAX_NUM_CONCURRENT_SESSIONS = 4
+
 
 def dataset_to_nwb(
     *,
@@ -34,19 +44,43 @@ def dataset_to_nwb(
         data_dir_path=data_dir_path,
     )
 
+    safe_session_to_nwb_kwargs_per_session = []
+    for session_to_nwb_kwargs in session_to_nwb_kwargs_per_session:
+        session_to_nwb_kwargs["output_dir_path"] = output_dir_path
+        session_to_nwb_kwargs["verbose"] = verbose
+        exception_file_path = data_dir_path / f"ERROR_<nwbfile_name>.txt"  # Add error file path here
+        safe_session_to_nwb_kwargs_per_session.append(
+            dict(session_to_nwb_kwargs=session_to_nwb_kwargs, exception_file_path=exception_file_path)
+        )
+    _safe_sessions_to_nwb(
+        safe_session_to_nwb_kwargs_per_session=safe_session_to_nwb_kwargs_per_session,
+        max_workers=max_workers,
+    )
+
+
+def _safe_sessions_to_nwb(
+    *,
+    safe_session_to_nwb_kwargs_per_session: list[dict],
+    max_workers: int,
+    safe_session_to_nwb_function: Callable | None = None,
+):
+    """Run `safe_session_to_nwb` (or a picklable wrapper of it) for each session in a pool of worker processes.
+
+    Parameters
+    ----------
+    safe_session_to_nwb_kwargs_per_session : list[dict]
+        The arguments of `safe_session_to_nwb` for each session.
+    max_workers : int
+        The number of worker processes.
+    safe_session_to_nwb_function : Callable, optional
+        The function run for each session, by default `safe_session_to_nwb`.
+    """
+    safe_session_to_nwb_function = safe_session_to_nwb_function or safe_session_to_nwb
+
     futures = []
     with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        for session_to_nwb_kwargs in session_to_nwb_kwargs_per_session:
-            session_to_nwb_kwargs["output_dir_path"] = output_dir_path
-            session_to_nwb_kwargs["verbose"] = verbose
-            exception_file_path = data_dir_path / f"ERROR_<nwbfile_name>.txt" # Add error file path here
-            futures.append(
-                executor.submit(
-                    safe_session_to_nwb,
-                    session_to_nwb_kwargs=session_to_nwb_kwargs,
-                    exception_file_path=exception_file_path,
-                )
-            )
+        for safe_session_to_nwb_kwargs in safe_session_to_nwb_kwargs_per_session:
+            futures.append(executor.submit(safe_session_to_nwb_function, **safe_session_to_nwb_kwargs))
         for _ in tqdm(as_completed(futures), total=len(futures)):
             pass
 
@@ -70,6 +104,163 @@ def safe_session_to_nwb(*, session_to_nwb_kwargs: dict, exception_file_path: Uni
             f.write(traceback.format_exc())
 
 
+def sessions_to_nwb(
+    one: ONE,
+    eids: list[str],
+    nwb_folder_path: str | Path,
+    functional_wavelength_nm: int,
+    isosbestic_wavelength_nm: int,
+    max_workers: int | None = 1,
+    refresh_sessions_metadata: bool = False,
+    **session_to_nwb_kwargs,
+):
+    """
+    Convert several sessions of widefield data to NWB format.
+
+    The session records of all sessions are fetched from ONE with a single REST query up front, instead of one query
+    per session, and kept in the ONE cache directory for later runs. With more than one worker, the sessions are
+    converted in separate processes, so the download, conversion and write of different sessions overlap.
+
+    As in `dataset_to_nwb`, a session that fails to convert does not stop the others: the error is written to
+    'ERROR_<eid>.txt' in `nwb_folder_path` (see `safe_session_to_nwb`).
+
+    Parameters
+    ----------
+    one: ONE
+        An instance of the ONE API to access data. Worker processes create their own instance, with the same
+        mode, Alyx URL, credentials and cache directory.
+    eids: list of str
+        The session IDs.
+    nwb_folder_path: str or Path
+        Path to the directory to save the output NWB files.
+    functional_wavelength_nm: int
+        Wavelength (in nm) for the functional imaging data.
+    isosbestic_wavelength_nm: int
+        Wavelength (in nm) for the isosbestic imaging data.
+    max_workers: int or None, default: 1
+        The number of sessions converted concurrently. If 1, the sessions are converted one after the other in
+        this process, while the data of the next session is downloaded in the background. If None, use as many
+        workers as sessions, up to the number of CPUs and MAX_NUM_CONCURRENT_SESSIONS.
+    refresh_sessions_metadata: bool, default: False
+        If True, query the session records from ONE again instead of using the ones cached by previous runs.
+    **session_to_nwb_kwargs
+        Additional keyword arguments passed to `session_to_nwb` (e.g. mode, stub_test).
+    """
+    # a session converted twice concurrently would write (and possibly redownload) the same files
+    eids = list(dict.fromkeys(eids))
+    if not eids:
+        return
+
+    # The records are persisted in the ONE cache directory, where the worker processes find them
+    _fetch_sessions_metadata(one=one, eids=eids, refresh=refresh_sessions_metadata)
+
+    nwb_folder_path = Path(nwb_folder_path)
+    nwb_folder_path.mkdir(parents=True, exist_ok=True)
+    session_to_nwb_kwargs.update(
+        nwb_folder_path=nwb_folder_path,
+        functional_wavelength_nm=functional_wavelength_nm,
+        isosbestic_wavelength_nm=isosbestic_wavelength_nm,
+    )
+
+    if max_workers is None:
+        max_workers = min(len(eids), os.cpu_count() or 1, MAX_NUM_CONCURRENT_SESSIONS)
+
+    if max_workers <= 1:
+        _sessions_to_nwb_with_prefetch(one=one, eids=eids, **session_to_nwb_kwargs)
+        return
+
+    # ONE instances (and their local cache tables) are not shared across processes
+    one_kwargs = _get_one_kwargs(one=one)
+    _safe_sessions_to_nwb(
+        safe_session_to_nwb_kwargs_per_session=[
+            dict(
+                one_kwargs=one_kwargs,
+                session_to_nwb_kwargs=dict(eid=eid, **session_to_nwb_kwargs),
+                exception_file_path=nwb_folder_path / f"ERROR_{eid}.txt",
+            )
+            for eid in eids
+        ],
+        max_workers=max_workers,
+        safe_session_to_nwb_function=_worker_safe_session_to_nwb,
+    )
+
+
+def _sessions_to_nwb_with_prefetch(one: ONE, eids: list[str], **session_to_nwb_kwargs) -> None:
+    """
+    Convert sessions one after the other, downloading the data of the next session while the current one is
+    converted (so the data of at most two sessions is downloaded at any time).
+
+    The files downloaded for a session are passed to `session_to_nwb`, which does not download them again. With
+    `redownload_data`, the local data of each session is cleared right before its own download. A session whose
+    download fails is skipped, and the error is written to 'ERROR_<eid>.txt' as for a failed conversion.
+
+    ONE is not thread-safe, so the downloads use their own ONE instance (see `_get_one_kwargs`).
+    """
+    mode = session_to_nwb_kwargs.get("mode", "raw")
+    nwb_folder_path = session_to_nwb_kwargs["nwb_folder_path"]
+    redownload_data = session_to_nwb_kwargs.pop("redownload_data", False)
+
+    download_one = ONE(**_get_one_kwargs(one=one))
+    with ThreadPoolExecutor(max_workers=1) as download_executor:
+        next_download = download_executor.submit(
+            download_widefield_session, eid=eids[0], one=download_one, mode=mode, redownload_data=redownload_data
+        )
+        for session_index, eid in enumerate(eids):
+            download = next_download
+            if session_index + 1 < len(eids):
+                next_download = download_executor.submit(
+                    download_widefield_session,
+                    eid=eids[session_index + 1],
+                    one=download_one,
+                    mode=mode,
+                    redownload_data=redownload_data,
+                )
+
+            exception_file_path = nwb_folder_path / f"ERROR_{eid}.txt"
+            try:
+                downloaded_file_paths = download.result()
+            except Exception:
+                with open(exception_file_path, mode="w") as f:
+                    f.write(f"download_widefield_session failed for eid '{eid}' (mode '{mode}')\n\n")
+                    f.write(traceback.format_exc())
+                print(f"Skipping session '{eid}': its data could not be downloaded (see '{exception_file_path}').")
+                continue
+
+            safe_session_to_nwb(
+                session_to_nwb_kwargs=dict(
+                    one=one, eid=eid, downloaded_file_paths=downloaded_file_paths, **session_to_nwb_kwargs
+                ),
+                exception_file_path=exception_file_path,
+            )
+
+
+def _get_one_kwargs(one: ONE) -> dict:
+    """
+    Return the arguments to create another ONE instance with the same mode, Alyx URL and cache directory.
+
+    In remote mode, the user name and REST token of a logged in instance are forwarded too, so the new instance is
+    authenticated without prompting for a password. They are not forwarded in local mode, where authenticating with a
+    token would query Alyx.
+    """
+    one_kwargs = dict(mode=one.mode, cache_dir=one.cache_dir)
+    alyx = getattr(one, "alyx", None)
+    if alyx is not None:
+        one_kwargs.update(base_url=alyx.base_url, silent=True)
+        if one.mode == "remote" and alyx.is_logged_in:
+            one_kwargs.update(username=alyx.user, token=alyx._token)
+    return one_kwargs
+
+
+def _worker_safe_session_to_nwb(
+    *, one_kwargs: dict, session_to_nwb_kwargs: dict, exception_file_path: Union[Path, str]
+) -> None:
+    """Run `safe_session_to_nwb` in a worker process, with a ONE instance created from `one_kwargs`."""
+    safe_session_to_nwb(
+        session_to_nwb_kwargs=dict(one=ONE(**one_kwargs), **session_to_nwb_kwargs),
+        exception_file_path=exception_file_path,
+    )
+
+
 def get_session_to_nwb_kwargs_per_session(
     *,
     data_dir_path: Union[str, Path],
@@ -1,18 +1,22 @@
 """Primary script to run to convert an entire session for of data using the NWBConverter."""
 
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from one.api import ONE
+from ibl_widefield_to_nwb.widefield2025 import conversion
 
-from ibl_widefield_to_nwb.widefield2025.conversion import (
-    convert_processed_session,
-    convert_raw_session,
-    download_widefield_session,
+if TYPE_CHECKING:
+    from one.api import ONE
+
+# Conversion function of each mode (only the module of the selected mode is imported)
+CONVERSION_FUNCTION_NAMES = dict(
+    raw="convert_raw_session",
+    processed="convert_processed_session",
 )
 
 
 def session_to_nwb(
-    one: ONE,
+    one: "ONE",
     eid: str,
     nwb_folder_path: str | Path,
     functional_wavelength_nm: int,
@@ -22,6 +26,8 @@ def session_to_nwb(
     stub_test: bool = False,
     append_on_disk_nwbfile: bool = False,
     redownload_data: bool = False,
+    downloaded_file_paths: list | None = None,
+    refresh_session_metadata: bool = False,
 ):
     """
     Convert a single session of widefield data to NWB format.
@@ -56,15 +62,26 @@ def session_to_nwb(
         If True, append data to an existing on-disk NWB file instead of creating a new one.
     redownload_data: bool, default: False
         If True, redownload data from ONE even if it already exists locally.
+    downloaded_file_paths: list, optional
+        The files of the session, as returned by `download_widefield_session` for this `mode` (e.g. downloaded in
+        advance by `sessions_to_nwb`). If provided, the session is not downloaded again and `redownload_data` is
+        ignored.
+    refresh_session_metadata: bool, default: False
+        If True, query the session record (subject and start time) from ONE again instead of using the one persisted
+        in the ONE cache directory by a previous run.
     """
 
+    if mode not in CONVERSION_FUNCTION_NAMES:
+        raise ValueError(f"Mode '{mode}' not recognized. Use 'raw' or 'processed'.")
+
+    # ONE (and the utilities depending on it or on neuroconv) are only imported once a session is converted
+    from ibl_widefield_to_nwb.widefield2025.utils import _get_session_metadata
+
     nwb_folder_path = Path(nwb_folder_path)
     nwb_folder_path.mkdir(parents=True, exist_ok=True)
 
-    try:
-        ((session_metadata),) = one.alyx.rest(url="sessions", action="list", id=eid)
-    except Exception as e:
-        raise RuntimeError(f"Failed to access ONE for eid {eid}: {e}")
+    # The refreshed record is persisted, so the converters read the same record
+    session_metadata = _get_session_metadata(one=one, eid=eid, refresh=refresh_session_metadata)
 
     subject_id = session_metadata["subject"]
     nwbfile_path = Path(nwb_folder_path) / f"sub-{subject_id}_ses-{eid}_desc-{mode}_ophys+behavior.nwb"
@@ -75,12 +92,13 @@ def session_to_nwb(
     # STEP 1: Download Widefield Session Data
     # ========================================================================
 
-    downloaded_file_paths = download_widefield_session(
-        eid=eid,
-        one=one,
-        mode=mode,
-        redownload_data=redownload_data,
-    )
+    if downloaded_file_paths is None:
+        downloaded_file_paths = conversion.download_widefield_session(
+            eid=eid,
+            one=one,
+            mode=mode,
+            redownload_data=redownload_data,
+        )
 
     # Organize downloaded files by collection
     widefield_session = {}
@@ -91,36 +109,31 @@ def session_to_nwb(
     # STEP 2: Convert Widefield Session Data to NWB
     # ========================================================================
 
-    match mode:
-        case "raw":
-            one_api_kwargs.update(
-                subject_id=subject_id,
-                nwbfiles_folder_path=nwb_folder_path,
-            )
-
-            nwbfile_path = convert_raw_session(
-                nwbfile_path=nwbfile_path,
-                raw_data_dir_path=widefield_session["raw_widefield_data"],
-                cache_dir_path=widefield_session["raw_widefield_data"] / "wf_cache",
-                nidq_data_dir_path=widefield_session["raw_ephys_data"],
-                processed_data_dir_path=widefield_session["alf/widefield"],
-                functional_wavelength_nm=functional_wavelength_nm,
-                isosbestic_wavelength_nm=isosbestic_wavelength_nm,
-                one_api_kwargs=one_api_kwargs,
-                force_cache=force_cache,
-                stub_test=stub_test,
-                append_on_disk_nwbfile=append_on_disk_nwbfile,
-            )
-        case "processed":
-            nwbfile_path = convert_processed_session(
-                nwbfile_path=nwbfile_path,
-                processed_data_dir_path=widefield_session["alf/widefield"],
-                functional_wavelength_nm=functional_wavelength_nm,
-                isosbestic_wavelength_nm=isosbestic_wavelength_nm,
-                one_api_kwargs=one_api_kwargs,
-                stub_test=stub_test,
-                append_on_disk_nwbfile=append_on_disk_nwbfile,
-            )
+    conversion_kwargs = dict(
+        nwbfile_path=nwbfile_path,
+        functional_wavelength_nm=functional_wavelength_nm,
+        isosbestic_wavelength_nm=isosbestic_wavelength_nm,
+        one_api_kwargs=one_api_kwargs,
+        stub_test=stub_test,
+        append_on_disk_nwbfile=append_on_disk_nwbfile,
+    )
+    if mode == "raw":
+        one_api_kwargs.update(
+            subject_id=subject_id,
+            nwbfiles_folder_path=nwb_folder_path,
+        )
+        conversion_kwargs.update(
+            raw_data_dir_path=widefield_session["raw_widefield_data"],
+            cache_dir_path=widefield_session["raw_widefield_data"] / "wf_cache",
+            nidq_data_dir_path=widefield_session["raw_ephys_data"],
+            processed_data_dir_path=widefield_session["alf/widefield"],
+            force_cache=force_cache,
+        )
+    else:
+        conversion_kwargs.update(processed_data_dir_path=widefield_session["alf/widefield"])
+
+    convert_session = getattr(conversion, CONVERSION_FUNCTION_NAMES[mode])
+    nwbfile_path = convert_session(**conversion_kwargs)
 
     print(f"\n✓ NWB file created/updated successfully at: {nwbfile_path}")
 
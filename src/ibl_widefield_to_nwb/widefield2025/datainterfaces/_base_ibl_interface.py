@@ -16,7 +16,8 @@ class BaseIBLDataInterface(BaseDataInterface):
         """
         Download data using ONE API.
 
-        Uses one.load_dataset() directly. Will raise exception if file missing.
+        Uses one.load_datasets() directly, so that ONE downloads the datasets concurrently in a single request.
+        Will raise exception if file missing.
 
         Parameters
         ----------
@@ -38,15 +39,13 @@ class BaseIBLDataInterface(BaseDataInterface):
 
         start_time = time.time()
         # NO try-except - let it fail if file missing!
-        downloaded_file_paths = []
-        for dataset in requirements["exact_files_options"]["standard"]:
-            downloaded_file_path = one.load_dataset(
-                eid,
-                dataset,
-                # revision=revision,
-                download_only=download_only,
-            )
-            downloaded_file_paths.append(downloaded_file_path)
+        downloaded_file_paths, _ = one.load_datasets(
+            eid,
+            requirements["exact_files_options"]["standard"],
+            # revision=revision,
+            download_only=download_only,
+        )
+        downloaded_file_paths = list(downloaded_file_paths)
         download_time = time.time() - start_time
         print(f"Downloaded Widefield data in {download_time:.2f} seconds.")
 
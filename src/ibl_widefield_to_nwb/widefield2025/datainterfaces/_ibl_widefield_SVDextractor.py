@@ -7,10 +7,27 @@ from pydantic import DirectoryPath
 from roiextractors import SegmentationExtractor
 from roiextractors.segmentationextractor import _ROIMasks, _RoiResponse
 
+from ibl_widefield_to_nwb.widefield2025.utils import _read_light_source_properties
+
 # TODO: remove once neuroconv writes height x width by default
 TRANSPOSE_OUTPUT = True
 
 
+def _select_frames(traces: np.ndarray, frame_indices: np.ndarray) -> np.ndarray:
+    """
+    Select the frames (last axis) of the traces of a channel.
+
+    The channels are interleaved, so the frames of a channel are usually evenly spaced. They are then selected with a
+    slice, which is a view of the memory-mapped traces instead of an in-memory copy of all the frames of the channel.
+    """
+    if len(frame_indices) > 0:
+        steps = np.diff(frame_indices)
+        step = int(steps[0]) if len(steps) > 0 else 1
+        if step > 0 and np.all(steps == step):
+            return traces[..., frame_indices[0] : frame_indices[-1] + 1 : step]
+    return traces[..., frame_indices]
+
+
 class WidefieldSVDExtractor(SegmentationExtractor):
     """A segmentation extractor for IBL Widefield processed data."""
 
@@ -56,8 +73,11 @@ class WidefieldSVDExtractor(SegmentationExtractor):
         self._ROI_masks_file_name = "widefieldU.images.npy"
         # summary images (both channels)
         self._mean_image_file_name = "widefieldChannels.frameAverage.npy"
+        # The (multi-GB) traces, masks and summary images are memory-mapped, so only the parts that are used
+        # (e.g. the frames of the selected channel) are read into memory.
 
         # Contains channel_id, color, wavelength information for the selected excitation wavelength
+        self._imaging_light_source_properties = None
         imaging_light_source_properties = self.get_imaging_light_source_properties()
         if len(imaging_light_source_properties) == 0:
             raise ValueError(f"No properties found for excitation wavelength '{self.excitation_wavelength_nm}' nm.")
@@ -89,31 +109,32 @@ class WidefieldSVDExtractor(SegmentationExtractor):
 
     # TODO: replace with loading from ONE API
     def _load_imaging_light_source_properties(self) -> pd.DataFrame:
-        all_imaging_light_source_properties = pd.read_csv(
-            self.folder_path / self._imaging_light_source_properties_file_name
+        file_path = self.folder_path / self._imaging_light_source_properties_file_name
+        all_imaging_light_source_properties = _read_light_source_properties(
+            file_path=str(file_path), modification_time_ns=file_path.stat().st_mtime_ns
         )
         return all_imaging_light_source_properties
 
     # TODO: replace with loading from ONE API
     def _load_roi_response_raw(self) -> np.ndarray:
-        all_roi_response_raw = np.load(self.folder_path / self._raw_traces_file_name)
+        all_roi_response_raw = np.load(self.folder_path / self._raw_traces_file_name, mmap_mode="r")
         return all_roi_response_raw
 
     # TODO: replace with loading from ONE API
     def _load_roi_response_dff(self) -> np.ndarray:
-        all_roi_response_dff = np.load(self.folder_path / self._corrected_traces_file_name)
+        all_roi_response_dff = np.load(self.folder_path / self._corrected_traces_file_name, mmap_mode="r")
         return all_roi_response_dff
 
     # TODO: replace with loading from ONE API
     def _load_mean_image(self) -> np.ndarray:
-        mean_images = np.load(self.folder_path / self._mean_image_file_name)
+        mean_images = np.load(self.folder_path / self._mean_image_file_name, mmap_mode="r")
         first_frame_index = self._frames_indices[0]
         mean_image = mean_images[first_frame_index, ...]
         return mean_image if not TRANSPOSE_OUTPUT else mean_image.transpose()
 
     # TODO: replace with loading from ONE API
     def _load_images(self):
-        all_images = np.load(self.folder_path / self._ROI_masks_file_name)
+        all_images = np.load(self.folder_path / self._ROI_masks_file_name, mmap_mode="r")
         return all_images
 
     # TODO: replace with loading from ONE API
@@ -122,11 +143,13 @@ class WidefieldSVDExtractor(SegmentationExtractor):
 
     # TODO: replace with loading from ONE API
     def get_imaging_light_source_properties(self) -> Dict[str, Any]:
-        all_imaging_light_source_properties = self._load_imaging_light_source_properties()
-        this_properties = all_imaging_light_source_properties[
-            all_imaging_light_source_properties["wavelength"] == self.excitation_wavelength_nm
-        ]
-        return this_properties.to_dict(orient="records")[0]
+        if self._imaging_light_source_properties is None:
+            all_imaging_light_source_properties = self._load_imaging_light_source_properties()
+            this_properties = all_imaging_light_source_properties[
+                all_imaging_light_source_properties["wavelength"] == self.excitation_wavelength_nm
+            ]
+            self._imaging_light_source_properties = this_properties.to_dict(orient="records")[0]
+        return dict(self._imaging_light_source_properties)
 
     def get_frame_indices(self) -> np.ndarray:
         """Get the frame indices for the selected channel.
@@ -217,8 +240,7 @@ class WidefieldSVDExtractor(SegmentationExtractor):
             # This loads the raw traces for all channels
             raw_traces = self._load_roi_response_raw()
             # Originally this is (num_rois, num_timepoints), we transpose to (num_timepoints, num_rois)
-            frame_indices = self.get_frame_indices()
-            raw_traces = raw_traces[:, frame_indices].T
+            raw_traces = _select_frames(traces=raw_traces, frame_indices=self._frames_indices).T
 
             cell_ids = list(range(raw_traces.shape[1]))
             self._roi_responses.append(_RoiResponse("raw", raw_traces, cell_ids))
@@ -1,10 +1,7 @@
-from copy import deepcopy
-from pathlib import Path
-
 from neuroconv.datainterfaces.ophys.basesegmentationextractorinterface import (
     BaseSegmentationExtractorInterface,
 )
-from neuroconv.utils import DeepDict, load_dict_from_file
+from neuroconv.utils import DeepDict
 from pydantic import DirectoryPath
 
 from ibl_widefield_to_nwb.widefield2025.datainterfaces._base_ibl_interface import (
@@ -13,6 +10,7 @@ from ibl_widefield_to_nwb.widefield2025.datainterfaces._base_ibl_interface impor
 from ibl_widefield_to_nwb.widefield2025.datainterfaces._ibl_widefield_SVDextractor import (
     WidefieldSVDExtractor,
 )
+from ibl_widefield_to_nwb.widefield2025.utils import _load_metadata_file
 
 
 class WidefieldSVDInterface(BaseSegmentationExtractorInterface, BaseIBLDataInterface):
@@ -37,7 +35,7 @@ class WidefieldSVDInterface(BaseSegmentationExtractorInterface, BaseIBLDataInter
             Data requirements specification with exact file paths
         """
         return {
-            "one_objects": [],  # Uses load_dataset directly, not load_object
+            "one_objects": [],  # Downloaded with a single one.load_datasets call, not load_object
             "exact_files_options": {
                 "standard": [
                     "alf/widefield/imaging.imagingLightSource.npy",
@@ -82,13 +80,11 @@ class WidefieldSVDInterface(BaseSegmentationExtractorInterface, BaseIBLDataInter
             Dictionary containing metadata including device information, imaging plane, plane segmentation, and fluorescence
             traces metadata.
         """
+        # The parent metadata is built fresh on every call, so it is updated in place instead of being deep-copied
         metadata = super().get_metadata()
-        metadata_copy = deepcopy(metadata)
 
         # Use single source of truth when updating metadata
-        ophys_metadata = load_dict_from_file(
-            file_path=Path(__file__).parent.parent / "_metadata" / "widefield_ophys_metadata.yaml"
-        )
+        ophys_metadata = _load_metadata_file("widefield_ophys_metadata.yaml")
 
         excitation_wavelength = float(self.source_data["excitation_wavelength_nm"])
         imaging_plane_metadata = next(
@@ -116,22 +112,22 @@ class WidefieldSVDInterface(BaseSegmentationExtractorInterface, BaseIBLDataInter
         if plane_segmentation_metadata is None:
             raise ValueError(f"No 'PlaneSegmentation' metadata found for imaging plane: {imaging_plane_name}. ")
 
-        metadata_copy["Ophys"]["Device"] = ophys_metadata["Ophys"]["Device"]
-        metadata_copy["Ophys"]["ImagingPlane"][0].update(imaging_plane_metadata)
-        metadata_copy["Ophys"]["ImageSegmentation"]["plane_segmentations"][0].update(plane_segmentation_metadata)
+        metadata["Ophys"]["Device"] = ophys_metadata["Ophys"]["Device"]
+        metadata["Ophys"]["ImagingPlane"][0].update(imaging_plane_metadata)
+        metadata["Ophys"]["ImageSegmentation"]["plane_segmentations"][0].update(plane_segmentation_metadata)
 
         image_segmentation_name = ophys_metadata["Ophys"]["ImageSegmentation"]["name"]
-        metadata_copy["Ophys"]["ImageSegmentation"].update(name=image_segmentation_name)
+        metadata["Ophys"]["ImageSegmentation"].update(name=image_segmentation_name)
 
         plane_segmentation_name = plane_segmentation_metadata["name"]
-        metadata_copy["Ophys"]["Fluorescence"].update(
+        metadata["Ophys"]["Fluorescence"].update(
             {plane_segmentation_name: ophys_metadata["Ophys"]["Fluorescence"][plane_segmentation_name]},
             name=ophys_metadata["Ophys"]["Fluorescence"]["name"],
         )
-        metadata_copy["Ophys"]["SegmentationImages"].update(
+        metadata["Ophys"]["SegmentationImages"].update(
             {plane_segmentation_name: ophys_metadata["Ophys"]["SegmentationImages"][plane_segmentation_name]},
             name=ophys_metadata["Ophys"]["SegmentationImages"]["name"],
             description=ophys_metadata["Ophys"]["SegmentationImages"]["description"],
         )
 
-        return metadata_copy
+        return metadata
@@ -1,15 +1,56 @@
 import json
+import mmap
 import re
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
 import numpy as np
-import pandas as pd
 from pydantic import DirectoryPath, FilePath
 from roiextractors import ImagingExtractor
 
+from ibl_widefield_to_nwb.widefield2025.utils import _read_light_source_properties
+
 # TODO: remove once neuroconv writes height x width by default
 TRANSPOSE_OUTPUT = True
+# The "#LED:channel,frame,timestamp" entries of a camera log (matched on the raw bytes of the file)
+CAMERA_LOG_LED_PATTERN = re.compile(rb"#LED:(\d+),(\d+),([\d.]+)")
+CAMERA_LOG_DTYPE = np.dtype([("channel_id", "int64"), ("frame_id", "int64"), ("timestamp", "float64")])
+
+
+@lru_cache(maxsize=4)
+def _read_camera_log(
+    camlog_file_path: str, modification_time_ns: int, max_num_entries: Optional[int] = None
+) -> np.ndarray:
+    """
+    Parse the "#LED:channel,frame,timestamp" entries of a camera log once for all the channels of a session.
+
+    The whole file is parsed in a single pass by `np.fromregex` into a (read-only, since it is shared) structured
+    array with the fields of CAMERA_LOG_DTYPE. When `max_num_entries` is given (e.g. for a partial frame cache), the
+    file is instead read line by line and only up to the last needed entry.
+
+    The modification time is part of the cache key so that an updated file is parsed again.
+    """
+    with open(camlog_file_path, "rb") as f:
+        if max_num_entries is None:
+            camera_log = np.fromregex(f, CAMERA_LOG_LED_PATTERN, dtype=CAMERA_LOG_DTYPE)
+        else:
+            matches = (CAMERA_LOG_LED_PATTERN.search(line) for line in f)
+            entries = islice((match.groups() for match in matches if match is not None), max_num_entries)
+            camera_log = np.array(list(entries), dtype=CAMERA_LOG_DTYPE)
+    camera_log.flags.writeable = False
+    return camera_log
+
+
+def _prefetch_frames(frames_mmap: mmap.mmap, frame_num_bytes: int, start_frame: int, stop_frame: int) -> None:
+    """Ask the kernel to asynchronously read a range of frames of the mapped file (no-op where not supported)."""
+    if not hasattr(mmap, "MADV_WILLNEED"):
+        return
+    # madvise needs a page-aligned start
+    start_byte = (int(start_frame) * frame_num_bytes) // mmap.PAGESIZE * mmap.PAGESIZE
+    stop_byte = int(stop_frame) * frame_num_bytes
+    frames_mmap.madvise(mmap.MADV_WILLNEED, start_byte, stop_byte - start_byte)
 
 
 class WidefieldImagingExtractor(ImagingExtractor):
@@ -18,6 +59,7 @@ class WidefieldImagingExtractor(ImagingExtractor):
 
     This extractor expects a cache folder produced by build_frame_cache(...) containing:
       - frames.dat : a numpy memmap file with shape (n_frames, height, width) storing grayscale frames (e.g. uint8)
+        (or frames.b2nd, a Blosc2 compressed array of the same shape, when built with compressed=True)
       - meta.json   : metadata with keys: total_num_samples, height, width, dtype, fps
 
     The extractor also requires:
@@ -58,10 +100,11 @@ class WidefieldImagingExtractor(ImagingExtractor):
 
         # Load on-disk metadata
         meta_path = self.cache_folder / "meta.json"
-        if not meta_path.exists():
-            raise FileNotFoundError(f"'meta.json' not found in cache folder: '{self.cache_folder}'")
-        with open(meta_path, "r") as f:
-            meta = json.load(f)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"'meta.json' not found in cache folder: '{self.cache_folder}'") from e
 
         # store metadata in a consistent structure
         self._video_metadata = dict(
@@ -70,84 +113,97 @@ class WidefieldImagingExtractor(ImagingExtractor):
             dtype=np.dtype(meta["dtype"]),
             sampling_frequency=float(meta.get("fps", np.nan)),
             memmap_path=str(self.cache_folder / "frames.dat"),
+            compressed_path=str(self.cache_folder / "frames.b2nd"),
         )
-
-        self._camera_log_metadata = self._get_camera_log_metadata()
+        self._is_compressed_cache = bool(meta.get("compressed", False))
+        # A partial cache only holds the first frames of the session (see build_frame_cache(max_num_frames=...))
+        self._is_partial_cache = meta.get("max_num_frames") is not None
+        # Opened on first read, then reused by every get_series call (and released with the extractor)
+        self._frame_cache = None
+        # The read-only mapping of frames.dat viewed by the frame cache array (None for a compressed cache)
+        self._frame_cache_mmap = None
+
+        camera_log_metadata = self._get_camera_log_metadata()
+        self._imaging_light_source_properties = None
         imaging_light_source_properties = self.get_imaging_light_source_properties()
         channel_id = imaging_light_source_properties["LED"]
         if len(imaging_light_source_properties) == 0:
             raise ValueError(f"No properties found for channel_id '{channel_id}'")
-        self._num_channels = len(np.unique(self._camera_log_metadata["channel_id"]))
+        # channel IDs are small non-negative integers, so they are counted in linear time instead of sorted
+        self._num_channels = int(np.count_nonzero(np.bincount(camera_log_metadata["channel_id"])))
         if self._num_channels != 2:
             raise ValueError(f"Expected 2 channels in camera log, found {self._num_channels}.")
-        # filter for channel_id and compute zero-indexed frame indices
-        self._camera_log_metadata = self._camera_log_metadata[
-            self._camera_log_metadata["channel_id"] == int(channel_id)
-        ].reset_index(drop=True)
-        self._frame_indices = self._camera_log_metadata["frame_id"].astype(int).to_numpy() - 1  # zero indexed
+        # filter for channel_id and compute zero-indexed frame indices and the timestamps once
+        is_channel_id = camera_log_metadata["channel_id"] == int(channel_id)
+        # zero indexed, as numpy's native index type so indexing the frame cache does not cast them
+        self._frame_indices = np.subtract(camera_log_metadata["frame_id"][is_channel_id], 1, dtype=np.intp)
+        self._timestamps = camera_log_metadata["timestamp"][is_channel_id]
 
         self._channel_names = ["OpticalChannel"]
         super().__init__()
 
-    def _load_frame_cache(self) -> np.memmap:
+    def _load_frame_cache(self):
         """
-        Load the memmap file containing cached frames.
+        Load the memmap file (or the Blosc2 array for a compressed cache) containing cached frames.
 
         Returns
         -------
-        np.memmap
-            Memory-mapped array of shape (n_frames, height, width).
+        np.ndarray or blosc2.NDArray
+            Array of shape (n_frames, height, width), viewing the read-only mapping of frames.dat.
         """
-        memmap_path = self._video_metadata["memmap_path"]
+        if self._frame_cache is not None:
+            return self._frame_cache
+
+        file_path = self._video_metadata["compressed_path" if self._is_compressed_cache else "memmap_path"]
         total = self._video_metadata["total_num_samples"]
         height, width = self._video_metadata["image_shape"]
-        dtype = self._video_metadata["dtype"]
 
-        frames_memmap = np.memmap(memmap_path, dtype=dtype, mode="r", shape=(total, height, width))
-        return frames_memmap
+        if self._is_compressed_cache:
+            import blosc2
+
+            self._frame_cache = blosc2.open(file_path, mode="r")
+        else:
+            with open(file_path, "rb") as f:
+                # the mapping stays valid after the file is closed
+                self._frame_cache_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._frame_cache = np.ndarray(
+                shape=(total, height, width), dtype=self._video_metadata["dtype"], buffer=self._frame_cache_mmap
+            )
+        return self._frame_cache
 
-    def _get_camera_log_metadata(self) -> pd.DataFrame:
+    def _get_camera_log_metadata(self) -> np.ndarray:
         """
-        Parse camera log file and return a DataFrame with typed columns:
+        Parse camera log file and return a structured array with typed fields:
           - channel_id (int)
           - frame_id (int)
           - timestamp (float)
         """
-        camera_log_data = []
-        with open(self.camlog_file_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if line and line.startswith("#LED"):
-                    match = re.match(r"#LED:(?P<channel_id>\d+),(?P<frame_id>\d+),(?P<timestamp>[\d\.]+)", line)
-                    if match:
-                        gd = match.groupdict()
-                        camera_log_data.append(
-                            {
-                                "channel_id": int(gd["channel_id"]),
-                                "frame_id": int(gd["frame_id"]),
-                                "timestamp": float(gd["timestamp"]),
-                            }
-                        )
-
-        # limit to available frames in the memmap, if needed
+        # limit to available frames in the memmap, if needed (a partial cache only needs the start of the log)
         total = self._video_metadata["total_num_samples"]
-        camera_log_data = camera_log_data[:total]
-        if len(camera_log_data) == 0:
-            # ensure at least a minimal DataFrame shape
-            return pd.DataFrame(columns=["channel_id", "frame_id", "timestamp"])
-        return pd.DataFrame.from_records(camera_log_data)
+        camera_log = _read_camera_log(
+            camlog_file_path=self.camlog_file_path,
+            modification_time_ns=Path(self.camlog_file_path).stat().st_mtime_ns,
+            max_num_entries=total if self._is_partial_cache else None,
+        )
+        return camera_log[:total]
 
     # TODO: replace with loading from ONE API
     def _load_imaging_light_source_properties(self):
-        all_imaging_light_source_properties = pd.read_csv(self.htsv_file_path, sep="\t", index_col=0)
-        return all_imaging_light_source_properties
+        all_imaging_light_source_properties = _read_light_source_properties(
+            file_path=self.htsv_file_path,
+            modification_time_ns=Path(self.htsv_file_path).stat().st_mtime_ns,
+        )
+        # the first column of the wiring file is its row index
+        return all_imaging_light_source_properties.set_index(all_imaging_light_source_properties.columns[0])
 
     def get_imaging_light_source_properties(self) -> Dict[str, Any]:
-        all_imaging_light_source_properties = self._load_imaging_light_source_properties()
-        this_properties = all_imaging_light_source_properties[
-            all_imaging_light_source_properties["wavelength"] == self.excitation_wavelength_nm
-        ]
-        return this_properties.to_dict(orient="records")[0]
+        if self._imaging_light_source_properties is None:
+            all_imaging_light_source_properties = self._load_imaging_light_source_properties()
+            this_properties = all_imaging_light_source_properties[
+                all_imaging_light_source_properties["wavelength"] == self.excitation_wavelength_nm
+            ]
+            self._imaging_light_source_properties = this_properties.to_dict(orient="records")[0]
+        return dict(self._imaging_light_source_properties)
 
     def get_image_shape(self) -> Tuple[int, int]:
         """Get the shape of the video frame (num_rows, num_columns).
@@ -199,10 +255,35 @@ class WidefieldImagingExtractor(ImagingExtractor):
 
         # open memmap and index into it
         frames_memmap = self._load_frame_cache()
+        if self._is_compressed_cache:
+            # compressed arrays only support slicing, read the span covering the selected frames and pick from it
+            first_frame_index, last_frame_index = frame_indices.min(), frame_indices.max()
+            series = frames_memmap[first_frame_index : last_frame_index + 1][frame_indices - first_frame_index]
+            return series if not TRANSPOSE_OUTPUT else series.transpose(0, 2, 1)
         # index memmap with the required frame indices (fast, no re-decode)
         series = np.asarray(frames_memmap[frame_indices])
+        # Frames are read in consecutive blocks while writing, so the kernel can start reading the next block from
+        # disk while this one is compressed and written to the NWB file.
+        next_frame_indices = self._frame_indices[end_sample : end_sample + len(frame_indices)]
+        if len(next_frame_indices) > 0:
+            _prefetch_frames(
+                frames_mmap=self._frame_cache_mmap,
+                frame_num_bytes=frames_memmap.itemsize * int(np.prod(frames_memmap.shape[1:])),
+                start_frame=next_frame_indices[0],
+                stop_frame=next_frame_indices[-1] + 1,
+            )
         return series if not TRANSPOSE_OUTPUT else series.transpose(0, 2, 1)
 
+    def set_times(self, times: np.ndarray) -> None:
+        """
+        Set the aligned times (in seconds) for the selected channel samples.
+
+        When the frame cache is partial, the session-wide times are truncated to the cached samples.
+        """
+        if self._is_partial_cache:
+            times = times[: self.get_num_samples()]
+        super().set_times(times=times)
+
     def get_native_timestamps(
         self, start_sample: Optional[int] = None, end_sample: Optional[int] = None
     ) -> Optional[np.ndarray]:
@@ -211,12 +292,11 @@ class WidefieldImagingExtractor(ImagingExtractor):
 
         Returns numpy array shape (n_samples,) or None if no timestamps available.
         """
-        if self._camera_log_metadata.shape[0] == 0:
+        if len(self._timestamps) == 0:
             return None
 
         start_sample = 0 if start_sample is None else int(start_sample)
         end_sample = len(self._frame_indices) if end_sample is None else int(end_sample)
 
-        # timestamps were parsed when building camera_log_metadata and filtered for channel in __init__
-        timestamps = self._camera_log_metadata["timestamp"].to_numpy(dtype=float)
-        return timestamps[start_sample:end_sample]
+        # timestamps were parsed from the camera log and filtered for channel in __init__
+        return self._timestamps[start_sample:end_sample]
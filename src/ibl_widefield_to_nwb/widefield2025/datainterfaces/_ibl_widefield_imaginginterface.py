@@ -1,11 +1,11 @@
-from copy import deepcopy
+import os
 from pathlib import Path
 from typing import Literal
 
 from neuroconv.datainterfaces.ophys.baseimagingextractorinterface import (
     BaseImagingExtractorInterface,
 )
-from neuroconv.utils import DeepDict, dict_deep_update, load_dict_from_file
+from neuroconv.utils import DeepDict, dict_deep_update
 from pydantic import DirectoryPath
 
 from ibl_widefield_to_nwb.widefield2025.datainterfaces._base_ibl_interface import (
@@ -15,6 +15,7 @@ from ibl_widefield_to_nwb.widefield2025.datainterfaces._ibl_widefield_imagingext
     TRANSPOSE_OUTPUT,
     WidefieldImagingExtractor,
 )
+from ibl_widefield_to_nwb.widefield2025.utils import _load_metadata_file
 
 
 class WidefieldImagingInterface(BaseImagingExtractorInterface, BaseIBLDataInterface):
@@ -39,7 +40,7 @@ class WidefieldImagingInterface(BaseImagingExtractorInterface, BaseIBLDataInterf
             Data requirements specification with exact file paths
         """
         return {
-            "one_objects": [],  # Uses load_dataset directly, not load_object
+            "one_objects": [],  # Downloaded with a single one.load_datasets call, not load_object
             "exact_files_options": {
                 "standard": [
                     "raw_widefield_data/imaging.frames.mov",
@@ -64,29 +65,37 @@ class WidefieldImagingInterface(BaseImagingExtractorInterface, BaseIBLDataInterf
         folder_path = Path(folder_path)
         cache_folder_path = Path(cache_folder_path)
 
-        cached_movie_file_path = cache_folder_path / "frames.dat"
-        if not cached_movie_file_path.exists():
+        cached_movie_file_paths = [cache_folder_path / "frames.dat", cache_folder_path / "frames.b2nd"]
+        if not any(file_path.exists() for file_path in cached_movie_file_paths):
             raise FileNotFoundError(
-                f"'frames.dat' not found in folder: {cache_folder_path}. Please build frame cache first."
+                f"No frame cache ('frames.dat' or 'frames.b2nd') found in folder: {cache_folder_path}. "
+                "Please build frame cache first."
             )
 
-        htsv_file_paths = list(folder_path.glob("*.htsv"))
+        # A single pass over the folder to find both the .htsv and the .camlog files
+        htsv_file_paths, camlog_file_paths = [], []
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.name.endswith(".htsv"):
+                    htsv_file_paths.append(entry.path)
+                elif entry.name.endswith(".camlog"):
+                    camlog_file_paths.append(entry.path)
+
         if len(htsv_file_paths) == 0:
             raise FileNotFoundError(f"No .htsv files found in folder: {folder_path}")
         elif len(htsv_file_paths) > 1:
             raise ValueError(
                 f"Multiple .htsv files found in folder: {folder_path}. Please ensure only one file is present."
             )
-        htsv_file_path = str(htsv_file_paths[0])
+        htsv_file_path = htsv_file_paths[0]
 
-        camlog_file_paths = list(folder_path.glob("*.camlog"))
         if len(camlog_file_paths) == 0:
             raise FileNotFoundError(f"No .camlog files found in folder: {folder_path}")
         elif len(camlog_file_paths) > 1:
             raise ValueError(
                 f"Multiple .camlog files found in folder: {folder_path}. Please ensure only one file is present."
             )
-        camlog_file_path = str(camlog_file_paths[0])
+        camlog_file_path = camlog_file_paths[0]
 
         super().__init__(
             folder_path=cache_folder_path,
@@ -107,13 +116,11 @@ class WidefieldImagingInterface(BaseImagingExtractorInterface, BaseIBLDataInterf
             Dictionary containing metadata including device information, imaging plane details,
             and one-photon series configuration.
         """
+        # The parent metadata is built fresh on every call, so it is updated in place instead of being deep-copied
         metadata = super().get_metadata()
-        metadata_copy = deepcopy(metadata)
 
         # Use single source of truth when updating metadata
-        ophys_metadata = load_dict_from_file(
-            file_path=Path(__file__).parent.parent / "_metadata" / "widefield_ophys_metadata.yaml"
-        )
+        ophys_metadata = _load_metadata_file("widefield_ophys_metadata.yaml")
 
         excitation_wavelength = float(self.source_data["excitation_wavelength_nm"])
         imaging_plane_metadata = next(
@@ -148,12 +155,12 @@ class WidefieldImagingInterface(BaseImagingExtractorInterface, BaseIBLDataInterf
             # Transpose it back to height x width (now it matches the series shape)
             one_photon_series_metadata["dimension"] = self.imaging_extractor.get_sample_shape()[::-1]
 
-        metadata_copy["Ophys"]["Device"] = ophys_metadata["Ophys"]["Device"]
-        metadata_copy["Ophys"]["ImagingPlane"][0] = dict_deep_update(
-            metadata_copy["Ophys"]["ImagingPlane"][0], imaging_plane_metadata
+        metadata["Ophys"]["Device"] = ophys_metadata["Ophys"]["Device"]
+        metadata["Ophys"]["ImagingPlane"][0] = dict_deep_update(
+            metadata["Ophys"]["ImagingPlane"][0], imaging_plane_metadata, copy=False
         )
-        metadata_copy["Ophys"]["OnePhotonSeries"][0] = dict_deep_update(
-            metadata_copy["Ophys"]["OnePhotonSeries"][0], one_photon_series_metadata
+        metadata["Ophys"]["OnePhotonSeries"][0] = dict_deep_update(
+            metadata["Ophys"]["OnePhotonSeries"][0], one_photon_series_metadata, copy=False
         )
 
-        return metadata_copy
+        return metadata
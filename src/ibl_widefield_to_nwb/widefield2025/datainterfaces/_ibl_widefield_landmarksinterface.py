@@ -5,7 +5,6 @@ from pydantic import FilePath
 from pynwb import NWBFile
 from pynwb.base import Images
 from pynwb.image import GrayscaleImage
-from wfield import im_apply_transform
 
 from ibl_widefield_to_nwb.widefield2025.datainterfaces._base_ibl_interface import (
     BaseIBLDataInterface,
@@ -28,7 +27,7 @@ class IblWidefieldLandmarksInterface(BaseIBLDataInterface):
             Data requirements specification with exact file paths
         """
         return {
-            "one_objects": [],  # Uses load_dataset directly, not load_object
+            "one_objects": [],  # Downloaded with a single one.load_datasets call, not load_object
             "exact_files_options": {
                 "standard": [
                     "alf/widefield/widefieldLandmarks.dorsalCortex.json",
@@ -47,6 +46,15 @@ class IblWidefieldLandmarksInterface(BaseIBLDataInterface):
         """
 
         super().__init__(file_path=file_path)
+        self._allen_landmarks = None
+
+    def _load_allen_landmarks(self) -> dict:
+        """Load (and parse) the landmarks JSON file once; both the landmarks and the coordinates tables use it."""
+        if self._allen_landmarks is None:
+            from wfield import load_allen_landmarks
+
+            self._allen_landmarks = load_allen_landmarks(self.source_data["file_path"])
+        return self._allen_landmarks
 
     def add_landmarks_to_nwbfile(
         self,
@@ -78,9 +86,9 @@ class IblWidefieldLandmarksInterface(BaseIBLDataInterface):
             Landmarks,
             SpatialTransformationMetadata,
         )
-        from wfield import load_allen_landmarks
+        from wfield import im_apply_transform
 
-        allen_landmarks = load_allen_landmarks(self.source_data["file_path"])
+        allen_landmarks = self._load_allen_landmarks()
 
         if "transform" not in allen_landmarks:
             raise ValueError("The JSON file must contain a 'transform' key with the transformation matrix.")
@@ -201,9 +209,8 @@ class IblWidefieldLandmarksInterface(BaseIBLDataInterface):
             Localization,
             Space,
         )
-        from wfield import load_allen_landmarks
 
-        allen_landmarks = load_allen_landmarks(self.source_data["file_path"])
+        allen_landmarks = self._load_allen_landmarks()
         if "landmarks" not in allen_landmarks:
             raise ValueError(
                 "The JSON file must contain 'landmarks' key with the anatomical coordinates for the landmarks."
@@ -7,7 +7,8 @@ from one.api import ONE
 from pydantic import DirectoryPath
 
 from ibl_widefield_to_nwb.widefield2025.utils import (
-    _get_imaging_times_by_excitation_wavelength_nm,
+    _get_imaging_times_by_excitation_wavelengths_nm,
+    _get_session_metadata,
 )
 
 
@@ -28,10 +29,7 @@ class WidefieldProcessedNWBConverter(ConverterPipe):
     def get_metadata(self):
         metadata = super().get_metadata()
 
-        try:
-            ((session_metadata),) = self.one.alyx.rest(url="sessions", action="list", id=self.eid)
-        except Exception as e:
-            raise RuntimeError(f"Failed to access ONE for eid {self.eid}: {e}")
+        session_metadata = _get_session_metadata(one=self.one, eid=self.eid)
 
         session_start_time = datetime.fromisoformat(session_metadata["start_time"])
         metadata["NWBFile"]["session_start_time"] = session_start_time
@@ -67,10 +65,7 @@ class WidefieldRawNWBConverter(ConverterPipe):
     def get_metadata(self):
         metadata = super().get_metadata()
 
-        try:
-            ((session_metadata),) = self.one.alyx.rest(url="sessions", action="list", id=self.eid)
-        except Exception as e:
-            raise RuntimeError(f"Failed to access ONE for eid {self.eid}: {e}")
+        session_metadata = _get_session_metadata(one=self.one, eid=self.eid)
 
         session_start_time = datetime.fromisoformat(session_metadata["start_time"])
         metadata["NWBFile"]["session_start_time"] = session_start_time
@@ -80,23 +75,25 @@ class WidefieldRawNWBConverter(ConverterPipe):
         return metadata
 
     def temporally_align_data_interfaces(self, metadata: dict | None = None, conversion_options: dict | None = None):
-        if "ImagingBlue" in self.data_interface_objects:
-            functional_imaging_interface = self.data_interface_objects["ImagingBlue"]
-
-            functional_imaging_times = _get_imaging_times_by_excitation_wavelength_nm(
-                excitation_wavelength_nm=self.FUNCTIONAL_WAVELENGTH_NM,
-                aligned_times_file_path=self._aligned_times_file_path,
-                light_source_file_path=self._light_source_file_path,
-                light_source_properties_file_path=self._light_source_properties_file_path,
-            )
-            functional_imaging_interface.imaging_extractor.set_times(times=functional_imaging_times)
-
-        if "ImagingViolet" in self.data_interface_objects:
-            isosbestic_imaging_interface = self.data_interface_objects["ImagingViolet"]
-            isosbestic_imaging_times = _get_imaging_times_by_excitation_wavelength_nm(
-                excitation_wavelength_nm=self.ISOSBESTIC_WAVELENGTH_NM,
-                aligned_times_file_path=self._aligned_times_file_path,
-                light_source_file_path=self._light_source_file_path,
-                light_source_properties_file_path=self._light_source_properties_file_path,
-            )
-            isosbestic_imaging_interface.imaging_extractor.set_times(times=isosbestic_imaging_times)
+        excitation_wavelengths_nm = dict(
+            ImagingBlue=self.FUNCTIONAL_WAVELENGTH_NM,
+            ImagingViolet=self.ISOSBESTIC_WAVELENGTH_NM,
+        )
+        excitation_wavelengths_nm = {
+            interface_name: excitation_wavelength_nm
+            for interface_name, excitation_wavelength_nm in excitation_wavelengths_nm.items()
+            if interface_name in self.data_interface_objects
+        }
+        if not excitation_wavelengths_nm:
+            return
+
+        # The times and light source files are opened once for both channels
+        imaging_times = _get_imaging_times_by_excitation_wavelengths_nm(
+            excitation_wavelengths_nm=list(excitation_wavelengths_nm.values()),
+            aligned_times_file_path=self._aligned_times_file_path,
+            light_source_file_path=self._light_source_file_path,
+            light_source_properties_file_path=self._light_source_properties_file_path,
+        )
+        for interface_name, excitation_wavelength_nm in excitation_wavelengths_nm.items():
+            imaging_interface = self.data_interface_objects[interface_name]
+            imaging_interface.imaging_extractor.set_times(times=imaging_times[excitation_wavelength_nm])
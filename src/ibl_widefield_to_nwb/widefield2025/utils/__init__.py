@@ -1,13 +1,27 @@
+from ._light_source_properties import _read_light_source_properties
+from ._metadata_files import _load_metadata_file
 from ._nidq_wiring import (
     _build_nidq_metadata_from_wiring,
     _get_analog_channel_groups_from_wiring,
     _get_digital_channel_groups_from_wiring,
 )
-from ._widefield_times import _get_imaging_times_by_excitation_wavelength_nm
+from ._session_metadata import (
+    _fetch_sessions_metadata,
+    _get_session_metadata,
+)
+from ._widefield_times import (
+    _get_imaging_times_by_excitation_wavelength_nm,
+    _get_imaging_times_by_excitation_wavelengths_nm,
+)
 
 __all__ = [
     "_get_imaging_times_by_excitation_wavelength_nm",
+    "_get_imaging_times_by_excitation_wavelengths_nm",
     "_get_analog_channel_groups_from_wiring",
     "_get_digital_channel_groups_from_wiring",
     "_build_nidq_metadata_from_wiring",
+    "_load_metadata_file",
+    "_read_light_source_properties",
+    "_fetch_sessions_metadata",
+    "_get_session_metadata",
 ]
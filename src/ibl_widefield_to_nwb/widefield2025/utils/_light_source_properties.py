@@ -0,0 +1,32 @@
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+
+@lru_cache(maxsize=4)
+def _read_light_source_properties(file_path: str, modification_time_ns: int) -> pd.DataFrame:
+    """
+    Parse a light source properties (.htsv) file once for the extractors of all the channels of a session.
+
+    Both the raw ("widefieldChannels.wiring.htsv") and the processed ("imagingLightSource.properties.htsv") files are
+    read by this parser; the separator (tab or comma) is taken from the header line. The returned DataFrame is shared
+    by the callers, which must not modify it.
+
+    The modification time is part of the cache key so that an updated file is parsed again.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the .htsv file.
+    modification_time_ns : int
+        The modification time of the file, in nanoseconds (e.g. `Path(file_path).stat().st_mtime_ns`).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per light source (e.g. with the channel ID, color and wavelength).
+    """
+    with open(file_path) as f:
+        header = f.readline()
+    return pd.read_csv(Path(file_path), sep="\t" if "\t" in header else ",")
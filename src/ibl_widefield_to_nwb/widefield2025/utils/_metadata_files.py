@@ -0,0 +1,31 @@
+from copy import deepcopy
+from functools import lru_cache
+from pathlib import Path
+
+from neuroconv.utils import load_dict_from_file
+
+METADATA_FOLDER_PATH = Path(__file__).parent.parent / "_metadata"
+
+
+@lru_cache(maxsize=None)
+def _read_metadata_file(file_name: str) -> dict:
+    return load_dict_from_file(file_path=METADATA_FOLDER_PATH / file_name)
+
+
+def _load_metadata_file(file_name: str) -> dict:
+    """
+    Load a YAML file from the `_metadata` folder.
+
+    The file is only read and parsed once per process; each call returns a deep copy that callers are free to modify.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the file in the `_metadata` folder (e.g. "widefield_ophys_metadata.yaml").
+
+    Returns
+    -------
+    dict
+        The metadata loaded from the file.
+    """
+    return deepcopy(_read_metadata_file(file_name))
@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+from one.api import ONE
+
+# Fields of the Alyx session records used by the conversion; only these are persisted in the ONE cache directory
+SESSION_METADATA_FIELDS = ("id", "subject", "start_time")
+SESSION_METADATA_FOLDER_NAME = "widefield_sessions_metadata"
+
+
+def _get_session_metadata_file_path(one: ONE, eid: str) -> Path:
+    return Path(one.cache_dir) / SESSION_METADATA_FOLDER_NAME / f"{eid}.json"
+
+
+def _load_session_metadata_files(one: ONE, eids: list[str]) -> dict[str, dict]:
+    """Return the session records persisted by previous runs, by eid (missing or unreadable files are skipped)."""
+    sessions_metadata = dict()
+    for eid in eids:
+        try:
+            sessions_metadata[eid] = json.loads(_get_session_metadata_file_path(one=one, eid=eid).read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+    return sessions_metadata
+
+
+def _save_session_metadata_file(one: ONE, session_metadata: dict) -> None:
+    file_path = _get_session_metadata_file_path(one=one, eid=session_metadata["id"])
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_text(json.dumps({field: session_metadata[field] for field in SESSION_METADATA_FIELDS}))
+
+
+def _fetch_sessions_metadata(one: ONE, eids: list[str], refresh: bool = False) -> dict[str, dict]:
+    """
+    Fetch the Alyx session records of several sessions with a single REST query.
+
+    Records are persisted per eid in the ONE cache directory, so only the sessions that were not fetched before (in
+    this or a previous run) are queried.
+
+    Parameters
+    ----------
+    one : ONE
+        An instance of the ONE API to access data.
+    eids : list of str
+        The session IDs.
+    refresh : bool, default: False
+        If True, query all the sessions again instead of using the persisted records (which are then updated).
+
+    Returns
+    -------
+    dict[str, dict]
+        The session record of each eid.
+    """
+    unique_eids = list(dict.fromkeys(eids))
+    sessions_metadata = dict() if refresh else _load_session_metadata_files(one=one, eids=unique_eids)
+    missing_eids = [eid for eid in unique_eids if eid not in sessions_metadata]
+
+    if missing_eids:
+        try:
+            # Alyx parses the value of a django filter as a Python literal, so `__in` needs a list literal
+            sessions = one.alyx.rest(url="sessions", action="list", django=f"id__in,{list(missing_eids)}")
+        except Exception as e:
+            raise RuntimeError(f"Failed to access ONE for eids {missing_eids}: {e}")
+        returned_eids = {session_metadata["id"] for session_metadata in sessions}
+        not_found_eids = [eid for eid in missing_eids if eid not in returned_eids]
+        if not_found_eids:
+            raise RuntimeError(f"Failed to access ONE for eids {not_found_eids}: session not found.")
+        for session_metadata in sessions:
+            sessions_metadata[session_metadata["id"]] = session_metadata
+            _save_session_metadata_file(one=one, session_metadata=session_metadata)
+
+    return {eid: sessions_metadata[eid] for eid in eids}
+
+
+def _get_session_metadata(one: ONE, eid: str, refresh: bool = False) -> dict:
+    """
+    Return the Alyx session record of a session, querying ONE only if it was not fetched before.
+
+    Parameters
+    ----------
+    one : ONE
+        An instance of the ONE API to access data.
+    eid : str
+        The session ID.
+    refresh : bool, default: False
+        If True, query ONE again instead of using the record persisted by a previous run (which is then updated).
+
+    Returns
+    -------
+    dict
+        The session record (e.g. with the "subject" and "start_time" of the session).
+    """
+    return _fetch_sessions_metadata(one=one, eids=[eid], refresh=refresh)[eid]
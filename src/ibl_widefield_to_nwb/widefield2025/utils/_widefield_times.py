@@ -1,7 +1,24 @@
+import csv
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
-import pandas as pd
+
+
+@lru_cache(maxsize=4)
+def _load_channel_ids_by_wavelength(
+    light_source_properties_file_path: str, modification_time_ns: int
+) -> dict[float, int]:
+    """
+    Map each excitation wavelength (nm) of a light source properties file to its (first) channel ID.
+
+    The modification time is part of the cache key so that an updated file is parsed again.
+    """
+    channel_ids_by_wavelength = dict()
+    with open(light_source_properties_file_path, newline="") as f:
+        for row in csv.DictReader(f):
+            channel_ids_by_wavelength.setdefault(float(row["wavelength"]), int(row["channel_id"]))
+    return channel_ids_by_wavelength
 
 
 def _get_channel_id_from_wavelength(
@@ -22,11 +39,14 @@ def _get_channel_id_from_wavelength(
     int
         The channel ID corresponding to the specified wavelength.
     """
-    light_sources = pd.read_csv(light_source_properties_file_path)
-    channel_ids = light_sources.loc[light_sources["wavelength"] == excitation_wavelength_nm, "channel_id"].tolist()
-    if len(channel_ids) == 0:
+    channel_ids_by_wavelength = _load_channel_ids_by_wavelength(
+        light_source_properties_file_path=str(light_source_properties_file_path),
+        modification_time_ns=Path(light_source_properties_file_path).stat().st_mtime_ns,
+    )
+    channel_id = channel_ids_by_wavelength.get(float(excitation_wavelength_nm))
+    if channel_id is None:
         raise ValueError(f"No channel ID found for wavelength {excitation_wavelength_nm} nm.")
-    return channel_ids[0]
+    return channel_id
 
 
 def _get_imaging_times_by_excitation_wavelength_nm(
@@ -54,14 +74,60 @@ def _get_imaging_times_by_excitation_wavelength_nm(
     np.ndarray
         Array of imaging times corresponding to the specified channel ID.
     """
-
-    channel_id = _get_channel_id_from_wavelength(
-        excitation_wavelength_nm=excitation_wavelength_nm,
+    imaging_times = _get_imaging_times_by_excitation_wavelengths_nm(
+        excitation_wavelengths_nm=[excitation_wavelength_nm],
+        aligned_times_file_path=aligned_times_file_path,
         light_source_properties_file_path=light_source_properties_file_path,
+        light_source_file_path=light_source_file_path,
     )
+    return imaging_times[excitation_wavelength_nm]
+
+
+def _get_imaging_times_by_excitation_wavelengths_nm(
+    excitation_wavelengths_nm: list[int],
+    aligned_times_file_path: Path | str,
+    light_source_properties_file_path: Path | str,
+    light_source_file_path: Path | str,
+) -> dict[int, np.ndarray]:
+    """
+    Get imaging times for several excitation wavelengths, opening the times and light source files once.
+
+    Parameters
+    ----------
+    excitation_wavelengths_nm : list of int
+        The excitation wavelengths in nanometers.
+    aligned_times_file_path : Path
+        Path to the .npy file ("imaging.times.npy") containing aligned imaging times.
+    light_source_file_path : Path
+        Path to the .npy file ("imaging.imagingLightSource.npy") containing light source channel IDs.
+    light_source_properties_file_path : Path
+        Path to the .htsv file ("imagingLightSource.properties.htsv") containing light source properties like
+        channel ID, color, wavelength.
+    Returns
+    -------
+    dict[int, np.ndarray]
+        Array of imaging times of each excitation wavelength.
+    """
+    # Only the times of the selected channels are copied into memory
+    all_times = np.load(aligned_times_file_path, mmap_mode="r")
+    light_sources = np.load(light_source_file_path, mmap_mode="r")
+    # np.compress would silently truncate the selection to the shorter array
+    if len(light_sources) != len(all_times):
+        raise IndexError(
+            f"The number of light source channel IDs ({len(light_sources)}) does not match the number of imaging "
+            f"times ({len(all_times)})."
+        )
+
+    imaging_times = dict()
+    for excitation_wavelength_nm in excitation_wavelengths_nm:
+        channel_id = _get_channel_id_from_wavelength(
+            excitation_wavelength_nm=excitation_wavelength_nm,
+            light_source_properties_file_path=light_source_properties_file_path,
+        )
+        is_channel_id = light_sources == channel_id
 
-    all_times = np.load(aligned_times_file_path)
-    light_sources = np.load(light_source_file_path)
+        times_per_channel_id = np.empty(np.count_nonzero(is_channel_id), dtype=all_times.dtype)
+        np.compress(is_channel_id, all_times, out=times_per_channel_id)
+        imaging_times[excitation_wavelength_nm] = times_per_channel_id
 
-    times_per_channel_id = all_times[light_sources == channel_id]
-    return times_per_channel_id
+    return imaging_times
@@ -0,0 +1,57 @@
+import pytest
+
+from ibl_widefield_to_nwb.widefield2025.conversion.behavior import (
+    _filter_session_datasets,
+    _split_dataset_path,
+)
+
+SESSION_DATASETS = [
+    "alf/_ibl_leftCamera.dlc.pqt",
+    "alf/#2024-05-06#/_ibl_rightCamera.dlc.pqt",
+    "alf/_ibl_leftCamera.features.pqt",
+    "alf/leftCamera.ROIMotionEnergy.npy",
+    "alf/widefield/imaging.times.npy",
+    "raw_video_data/_iblrig_leftCamera.raw.mp4",
+    "_ibl_trials.table.pqt",
+]
+
+
+@pytest.mark.parametrize(
+    "dataset, expected",
+    [
+        ("alf/_ibl_leftCamera.dlc.pqt", ("alf", "_ibl_leftCamera.dlc.pqt")),
+        ("alf/#2024-05-06#/_ibl_rightCamera.dlc.pqt", ("alf", "_ibl_rightCamera.dlc.pqt")),
+        ("alf/widefield/#2024-05-06#/imaging.times.npy", ("alf/widefield", "imaging.times.npy")),
+        ("#2024-05-06#/_ibl_trials.table.pqt", ("", "_ibl_trials.table.pqt")),
+        ("_ibl_trials.table.pqt", ("", "_ibl_trials.table.pqt")),
+    ],
+)
+def test_split_dataset_path(dataset, expected):
+    assert _split_dataset_path(dataset) == expected
+
+
+def test_filter_session_datasets_by_filename():
+    assert _filter_session_datasets(session_datasets=SESSION_DATASETS, filename="*.dlc*") == [
+        "alf/_ibl_leftCamera.dlc.pqt",
+        "alf/#2024-05-06#/_ibl_rightCamera.dlc.pqt",
+    ]
+
+
+def test_filter_session_datasets_by_collection():
+    # the revision folder is not part of the collection, as in `one.list_datasets`
+    assert _filter_session_datasets(session_datasets=SESSION_DATASETS, filename="*Camera*", collection="alf") == [
+        "alf/_ibl_leftCamera.dlc.pqt",
+        "alf/#2024-05-06#/_ibl_rightCamera.dlc.pqt",
+        "alf/_ibl_leftCamera.features.pqt",
+        "alf/leftCamera.ROIMotionEnergy.npy",
+    ]
+    # sub-collections are not matched by their parent collection
+    assert _filter_session_datasets(session_datasets=SESSION_DATASETS, filename="*.npy", collection="alf") == [
+        "alf/leftCamera.ROIMotionEnergy.npy"
+    ]
+
+
+def test_filter_session_datasets_no_match():
+    assert (
+        _filter_session_datasets(session_datasets=SESSION_DATASETS, filename="*Camera.raw.mp4*", collection="alf") == []
+    )
@@ -0,0 +1,122 @@
+import json
+
+import numpy as np
+import pytest
+
+from ibl_widefield_to_nwb.widefield2025.datainterfaces._ibl_widefield_imagingextractor import (
+    TRANSPOSE_OUTPUT,
+    WidefieldImagingExtractor,
+    _read_camera_log,
+)
+
+NUM_FRAMES = 40
+HEIGHT, WIDTH = 6, 8
+
+
+@pytest.fixture
+def camlog_file_path(tmp_path):
+    # the two LEDs alternate, with other log lines in between
+    lines = ["# Log header\n"]
+    for frame_index in range(NUM_FRAMES + 2):
+        lines.append(f"#LED:{frame_index % 2 + 1},{frame_index + 1},{frame_index * 0.015:.3f}\n")
+        if frame_index % 10 == 0:
+            lines.append(f"#Frame rate check {frame_index}\n")
+    file_path = tmp_path / "widefieldEvents.raw.camlog"
+    file_path.write_text("".join(lines))
+    return file_path
+
+
+@pytest.fixture
+def htsv_file_path(tmp_path):
+    file_path = tmp_path / "widefieldChannels.wiring.htsv"
+    file_path.write_text("index\tLED\tcolor\twavelength\n0\t1\tViolet\t405\n1\t2\tBlue\t470\n")
+    return file_path
+
+
+@pytest.fixture
+def frames():
+    return np.random.default_rng(seed=0).integers(0, 256, size=(NUM_FRAMES, HEIGHT, WIDTH), dtype="uint8")
+
+
+def _write_frame_cache(cache_folder_path, frames, compressed: bool):
+    from ibl_widefield_to_nwb.widefield2025.conversion.build_cache import (
+        COMPRESSED_FRAMES_FILE_NAME,
+        FRAMES_FILE_NAME,
+        _create_compressed_frame_cache,
+    )
+
+    cache_folder_path.mkdir()
+    if compressed:
+        compressed_frames = _create_compressed_frame_cache(
+            data_path=cache_folder_path / COMPRESSED_FRAMES_FILE_NAME,
+            shape=frames.shape,
+            dtype=frames.dtype,
+            batch_size=16,
+        )
+        compressed_frames[:] = frames
+    else:
+        frames.tofile(cache_folder_path / FRAMES_FILE_NAME)
+    meta = dict(
+        total_num_samples=len(frames),
+        height=HEIGHT,
+        width=WIDTH,
+        dtype=str(frames.dtype),
+        fps=30.0,
+        max_num_frames=None,
+        compressed=compressed,
+        decoder="opencv",
+    )
+    (cache_folder_path / "meta.json").write_text(json.dumps(meta))
+    return cache_folder_path
+
+
+def test_read_camera_log(camlog_file_path):
+    camera_log = _read_camera_log(
+        camlog_file_path=str(camlog_file_path), modification_time_ns=camlog_file_path.stat().st_mtime_ns
+    )
+
+    assert len(camera_log) == NUM_FRAMES + 2
+    np.testing.assert_array_equal(camera_log["channel_id"][:4], [1, 2, 1, 2])
+    np.testing.assert_array_equal(camera_log["frame_id"], np.arange(1, NUM_FRAMES + 3))
+    assert camera_log["timestamp"][3] == pytest.approx(0.045)
+    # the parsed log is shared by the extractors of both channels
+    assert not camera_log.flags.writeable
+
+
+def test_read_camera_log_partial(camlog_file_path):
+    modification_time_ns = camlog_file_path.stat().st_mtime_ns
+    camera_log = _read_camera_log(camlog_file_path=str(camlog_file_path), modification_time_ns=modification_time_ns)
+    partial_camera_log = _read_camera_log(
+        camlog_file_path=str(camlog_file_path), modification_time_ns=modification_time_ns, max_num_entries=11
+    )
+
+    assert partial_camera_log.dtype == camera_log.dtype
+    np.testing.assert_array_equal(partial_camera_log, camera_log[:11])
+
+
+@pytest.mark.parametrize("excitation_wavelength_nm, channel_id", [(405, 1), (470, 2)])
+def test_get_series_compressed(
+    tmp_path, frames, htsv_file_path, camlog_file_path, excitation_wavelength_nm, channel_id
+):
+    pytest.importorskip("blosc2")
+
+    series_per_cache = []
+    for compressed in (False, True):
+        cache_folder_path = _write_frame_cache(
+            cache_folder_path=tmp_path / f"wf_cache_{compressed}", frames=frames, compressed=compressed
+        )
+        extractor = WidefieldImagingExtractor(
+            folder_path=cache_folder_path,
+            htsv_file_path=htsv_file_path,
+            camlog_file_path=camlog_file_path,
+            excitation_wavelength_nm=excitation_wavelength_nm,
+        )
+        # the camera log has more entries than the cache has frames
+        assert extractor.get_num_samples() == NUM_FRAMES // 2
+        series_per_cache.append(extractor.get_series(start_sample=3, end_sample=12))
+
+    expected_series = frames[channel_id - 1 :: 2][3:12]
+    if TRANSPOSE_OUTPUT:
+        expected_series = expected_series.transpose(0, 2, 1)
+    for series in series_per_cache:
+        np.testing.assert_array_equal(np.asarray(series), expected_series)
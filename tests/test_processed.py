@@ -0,0 +1,41 @@
+import math
+
+import pytest
+
+from ibl_widefield_to_nwb.widefield2025.conversion.processed import (
+    SVD_BUFFER_SIZE_BYTES,
+    _get_svd_buffer_shape,
+)
+
+
+@pytest.mark.parametrize(
+    "chunk_shape, full_shape, itemsize",
+    [
+        # spatial components (components x height x width), one chunk per component image
+        ((1, 540, 640), (200, 540, 640), 8),
+        # temporal components (samples x components)
+        ((4096, 200), (100_000, 200), 8),
+        ((4096, 200), (2_000_000, 200), 8),
+        # summary images
+        ((540, 640), (540, 640), 4),
+    ],
+)
+def test_get_svd_buffer_shape(chunk_shape, full_shape, itemsize):
+    buffer_shape = _get_svd_buffer_shape(chunk_shape=chunk_shape, full_shape=full_shape, itemsize=itemsize)
+
+    assert math.prod(buffer_shape) * itemsize <= SVD_BUFFER_SIZE_BYTES
+    for buffer_length, chunk_length, full_length in zip(buffer_shape, chunk_shape, full_shape):
+        assert buffer_length <= full_length
+        # made of whole chunks, except at the end of an axis
+        assert buffer_length == full_length or buffer_length % chunk_length == 0
+
+
+def test_get_svd_buffer_shape_capped():
+    # 2M samples of 200 float64 components is ~3.2 GB, more than a single buffer
+    buffer_shape = _get_svd_buffer_shape(chunk_shape=(4096, 200), full_shape=(2_000_000, 200), itemsize=8)
+
+    assert buffer_shape == (SVD_BUFFER_SIZE_BYTES // (200 * 8) // 4096 * 4096, 200)
+
+
+def test_get_svd_buffer_shape_small_dataset():
+    assert _get_svd_buffer_shape(chunk_shape=(1, 54, 64), full_shape=(20, 54, 64), itemsize=8) == (20, 54, 64)
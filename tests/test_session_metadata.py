@@ -0,0 +1,69 @@
+import ast
+from types import SimpleNamespace
+
+import pytest
+
+from ibl_widefield_to_nwb.widefield2025.utils import (
+    _fetch_sessions_metadata,
+    _get_session_metadata,
+)
+
+
+class FakeAlyx:
+    """Answers `rest(url="sessions", action="list", django="id__in,[...]")` queries from a fixed set of sessions."""
+
+    def __init__(self, sessions: dict[str, dict]):
+        self.sessions = sessions
+        self.queried_eids = []
+
+    def rest(self, url: str, action: str, django: str):
+        assert (url, action) == ("sessions", "list")
+        field, _, value = django.partition(",")
+        assert field == "id__in"
+        # Alyx parses the value as a Python literal
+        eids = ast.literal_eval(value)
+        self.queried_eids.append(eids)
+        return [self.sessions[eid] for eid in eids if eid in self.sessions]
+
+
+def _make_session(eid: str, subject: str) -> dict:
+    return dict(id=eid, subject=subject, start_time="2024-05-06T10:20:30", lab="cortexlab")
+
+
+@pytest.fixture
+def one(tmp_path):
+    sessions = {eid: _make_session(eid=eid, subject=f"subject_{eid}") for eid in ("eid_0", "eid_1", "eid_2")}
+    return SimpleNamespace(cache_dir=tmp_path, alyx=FakeAlyx(sessions=sessions))
+
+
+def test_fetch_sessions_metadata_single_query(one):
+    sessions_metadata = _fetch_sessions_metadata(one=one, eids=["eid_0", "eid_1", "eid_0"])
+
+    assert one.alyx.queried_eids == [["eid_0", "eid_1"]]
+    assert list(sessions_metadata) == ["eid_0", "eid_1"]
+    assert sessions_metadata["eid_1"]["subject"] == "subject_eid_1"
+
+
+def test_fetch_sessions_metadata_only_queries_missing_sessions(one):
+    _fetch_sessions_metadata(one=one, eids=["eid_0"])
+    sessions_metadata = _fetch_sessions_metadata(one=one, eids=["eid_0", "eid_2"])
+
+    assert one.alyx.queried_eids == [["eid_0"], ["eid_2"]]
+    # only the fields used by the conversion are persisted
+    assert sessions_metadata["eid_0"] == dict(id="eid_0", subject="subject_eid_0", start_time="2024-05-06T10:20:30")
+
+
+def test_fetch_sessions_metadata_refresh(one):
+    _fetch_sessions_metadata(one=one, eids=["eid_0"])
+    one.alyx.sessions["eid_0"]["subject"] = "renamed_subject"
+
+    assert _get_session_metadata(one=one, eid="eid_0")["subject"] == "subject_eid_0"
+    assert _get_session_metadata(one=one, eid="eid_0", refresh=True)["subject"] == "renamed_subject"
+    # the refreshed record replaces the persisted one
+    assert _get_session_metadata(one=one, eid="eid_0")["subject"] == "renamed_subject"
+    assert one.alyx.queried_eids == [["eid_0"], ["eid_0"]]
+
+
+def test_fetch_sessions_metadata_session_not_found(one):
+    with pytest.raises(RuntimeError, match="missing_eid"):
+        _fetch_sessions_metadata(one=one, eids=["eid_0", "missing_eid"])